@@ -1,8 +1,10 @@
-from flask import Flask, send_from_directory, send_file
+from flask import Flask, send_file
 from flask_cors import CORS
 import os
 import io
 from database import init_db
+from middleware.compression import init_compression, send_precompressed
+from middleware.rate_limit import init_rate_limit
 
 
 def create_app():
@@ -11,6 +13,46 @@ def create_app():
 
     init_db(app)
     CORS(app)  # Разрешить CORS для фронтенда
+    init_compression(app)
+    init_rate_limit(app)
+
+    # CLI: flask --app app stats-counters verify|rebuild, stats-daily-rollup
+    from services.stats_counter_service import stats_counters_command
+    from services.timeseries_service import stats_daily_rollup_command
+    app.cli.add_command(stats_counters_command)
+    app.cli.add_command(stats_daily_rollup_command)
+
+    # Фоновые задачи: обновление материализованных представлений статистики,
+    # сверка нагрузки мастеров для автоназначения, отметка просроченных заявок,
+    # синхронизация отозванных токенов, дневные агрегаты временных рядов
+    from services.scheduler import Scheduler
+    from services.stat_views import StatisticsViews
+    from services.master_assignment import MasterAssignment
+    from services.sla_service import SlaService
+    from services.token_revocation import TokenRevocation
+    from services.timeseries_service import TimeseriesService
+    StatisticsViews.register_jobs(app, Scheduler)
+    Scheduler.add_job(
+        'reconcile_master_loads',
+        app.config.get('MASTER_ASSIGNMENT_RECONCILE_INTERVAL', 60),
+        MasterAssignment.reconcile
+    )
+    Scheduler.add_job(
+        'flag_overdue_requests',
+        app.config.get('OVERDUE_CHECK_INTERVAL', 3600),
+        SlaService.flag_overdue
+    )
+    Scheduler.add_job(
+        'refresh_token_revocations',
+        app.config.get('TOKEN_REVOCATION_REFRESH_INTERVAL', 30),
+        TokenRevocation.refresh
+    )
+    Scheduler.add_job(
+        'roll_up_stats_daily',
+        app.config.get('STATS_DAILY_ROLLUP_INTERVAL', 3600),
+        TimeseriesService.roll_up
+    )
+    Scheduler.start(app)
 
     # Импорт всех blueprints
     from routes.auth import auth_bp
@@ -46,7 +88,7 @@ def create_app():
     @app.route("/")
     @app.route("/index.html")
     def index():
-        return send_from_directory("frontend", "index.html")
+        return send_precompressed("frontend", "index.html")
 
     # Catch-all для SPA (раздача фронтенда)
     @app.route("/<path:path>")
@@ -58,10 +100,10 @@ def create_app():
         # Проверить, существует ли файл
         full_path = os.path.join("frontend", path)
         if os.path.exists(full_path):
-            return send_from_directory("frontend", path)
+            return send_precompressed("frontend", path)
 
         # Иначе вернуть index.html (для SPA маршрутизации)
-        return send_from_directory("frontend", "index.html")
+        return send_precompressed("frontend", "index.html")
 
     return app
 
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,11 +12,97 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Применять недостающие миграции при старте (иначе - python -m migrations upgrade)
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
     JSON_AS_ASCII = False
     JSON_SORT_KEYS = False
 
     SECRET_KEY = os.getenv("SECRET_KEY", "1")
 
+    # Ограничение частоты запросов (token bucket): "<число>/second|minute|hour"
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # Общее хранилище для нескольких процессов, например redis://localhost:6379/0
+    RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL")
+    # Лимиты по IP на blueprint для изменяющих методов
+    RATE_LIMIT_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
+    RATE_LIMITS = {
+        "auth": "20/minute",
+        "requests": "120/minute",
+        "comments": "60/minute",
+        "users": "30/minute",
+    }
+    # Вход по одному логину независимо от IP
+    RATE_LIMIT_LOGIN = "5/minute"
+
+    # Хеширование паролей: метод и стоимость werkzeug ("pbkdf2:sha256:600000",
+    # "scrypt:32768:8:1"); при входе хеши с другими параметрами пересчитываются
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    # Потоки хеширования и длина очереди; сверх нее вход отвечает 503 с Retry-After
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+    PASSWORD_HASH_RETRY_AFTER = 1
+
+    # Срок жизни JWT, часы (выдача токенов и очистка записей об отзыве)
+    TOKEN_LIFETIME_HOURS = int(os.getenv("TOKEN_LIFETIME_HOURS", "24"))
+    # Кэш проверенных JWT (записей); 0 - проверять подпись при каждом запросе
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    # Период синхронизации отозванных токенов с БД (отзывы из других воркеров), секунды
+    TOKEN_REVOCATION_REFRESH_INTERVAL = int(os.getenv("TOKEN_REVOCATION_REFRESH_INTERVAL", "30"))
+
+    # Кэш статистики: TTL в секундах, сбрасывается при изменении заявок и пользователей
+    STATS_CACHE_ENABLED = os.getenv("STATS_CACHE_ENABLED", "true").lower() == "true"
+    STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "300"))
+    # Максимум записей в кэше статистики на процесс (ключи timeseries задает клиент)
+    STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "256"))
+
+    # Параллельный расчет частей сводной статистики; потоков не больше, чем
+    # свободных соединений в пуле SQLAlchemy (по умолчанию pool_size=5)
+    STATS_PARALLEL = os.getenv("STATS_PARALLEL", "false").lower() == "true"
+    STATS_MAX_WORKERS = int(os.getenv("STATS_MAX_WORKERS", "4"))
+
+    # Фоновые задачи внутри процесса приложения (services/scheduler.py)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+
+    # Материализованные представления статистики (PostgreSQL), период обновления в секундах
+    STATS_MATVIEWS_ENABLED = os.getenv("STATS_MATVIEWS_ENABLED", "true").lower() == "true"
+    STATS_MATVIEWS_REFRESH_INTERVAL = int(os.getenv("STATS_MATVIEWS_REFRESH_INTERVAL", "300"))
+
+    # Сверка нагрузки мастеров для автоназначения с stats_counters, секунды
+    MASTER_ASSIGNMENT_RECONCILE_INTERVAL = int(os.getenv("MASTER_ASSIGNMENT_RECONCILE_INTERVAL", "60"))
+
+    # Сроки выполнения заявок в днях: по умолчанию и по типам техники,
+    # например SLA_DAYS_BY_TECH_TYPE='{"Холодильник": 21, "Фен": 7}'
+    SLA_DAYS_DEFAULT = int(os.getenv("SLA_DAYS_DEFAULT", "14"))
+    SLA_DAYS_BY_TECH_TYPE = json.loads(os.getenv("SLA_DAYS_BY_TECH_TYPE", "{}"))
+    # Период задачи отметки просроченных заявок, секунды
+    OVERDUE_CHECK_INTERVAL = int(os.getenv("OVERDUE_CHECK_INTERVAL", "3600"))
+
+    # Максимум строк ответа /api/statistics/cube (остальные отбрасываются, truncated=true)
+    STATS_CUBE_MAX_ROWS = int(os.getenv("STATS_CUBE_MAX_ROWS", "5000"))
+
+    # Максимальная длина диапазона /api/statistics/timeseries в днях
+    STATS_TIMESERIES_MAX_DAYS = int(os.getenv("STATS_TIMESERIES_MAX_DAYS", "1830"))
+    # Период агрегирования закрытых дней в stats_daily, секунды
+    STATS_DAILY_ROLLUP_INTERVAL = int(os.getenv("STATS_DAILY_ROLLUP_INTERVAL", "3600"))
+
+    # Сжатие ответов (gzip, br при установленном пакете brotli)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 4
+    COMPRESS_MIMETYPES = [
+        "application/json",
+        "application/javascript",
+        "text/javascript",
+        "text/html",
+        "text/css",
+        "text/plain",
+        "text/csv",
+        "application/x-ndjson",
+        "image/svg+xml",
+    ]
+
     FEEDBACK_FORM_URL = os.getenv(
         "FEEDBACK_FORM_URL",
         "https://docs.google.com/forms/d/e/1FAIpQLSdhZcExx6LSIXxk0ub55mSu-WIh23WYdGG9HY5EZhLDo7P8eA/viewform?usp=sf_link",
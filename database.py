@@ -9,14 +9,25 @@ def init_db(app):
     db.init_app(app)
 
     with app.app_context():
-        # ВАЖНО: Импортируем модели ДО создания таблиц
-        # Иначе SQLAlchemy не увидит модели и не создаст таблицы
+        # Импортируем модели, чтобы они были зарегистрированы в db.metadata
         from models.user import User
         from models.repair_request import RepairRequest
         from models.comment import Comment
+        from models.stats_counter import StatsCounter
+        from models.stats_daily import StatsDaily, StatsDailyDay
 
-        # Создаем таблицы если их нет
-        db.create_all()
+        # Схемой управляют миграции (migrations/), а не create_all:
+        # при старте проверяется версия схемы и применяются недостающие миграции
+        from migrations import ensure_schema
+        ensure_schema(app, db.engine)
+
+        # Счетчики статистики обновляются в транзакциях изменения заявок
+        from services.stats_counter_service import StatsCounterService
+        StatsCounterService.register()
+
+        # Нагрузка мастеров для автоназначения обновляется после commit
+        from services.master_assignment import MasterAssignment
+        MasterAssignment.register()
         print("✓ База данных инициализирована")
 
 
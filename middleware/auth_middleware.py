@@ -1,9 +1,33 @@
 # middleware/auth_middleware.py
 
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
 from services.auth_service import AuthService
 
+def resolve_principal():
+    """
+    Проверить токен запроса один раз и сохранить результат в flask.g
+
+    Возвращает (payload, error). Повторные вызовы в том же запросе (например
+    вложенные require_auth и require_role) не разбирают заголовок заново.
+    """
+    if 'principal' in g:
+        return g.principal, g.auth_error
+
+    payload, error = None, None
+    auth_header = request.headers.get('Authorization')
+
+    if not auth_header:
+        error = 'Missing Authorization header'
+    elif not auth_header.startswith('Bearer '):
+        error = 'Invalid Authorization header format'
+    else:
+        payload, error = AuthService.verify_token(auth_header.split(' ')[1])
+
+    g.principal, g.auth_error = payload, error
+    return payload, error
+
+
 def require_auth(f):
     """
     Декоратор для проверки наличия валидного токена
@@ -15,19 +39,7 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Получение токена из header
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header:
-            return jsonify({'error': 'Missing Authorization header'}), 401
-
-        if not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Invalid Authorization header format'}), 401
-
-        token = auth_header.split(' ')[1]
-
-        # Проверка токена
-        payload, error = AuthService.verify_token(token)
+        payload, error = resolve_principal()
 
         if error:
             return jsonify({'error': error}), 401
@@ -51,16 +63,7 @@ def require_role(*allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Получение токена
-            auth_header = request.headers.get('Authorization')
-
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Missing or invalid Authorization header'}), 401
-
-            token = auth_header.split(' ')[1]
-
-            # Проверка токена
-            payload, error = AuthService.verify_token(token)
+            payload, error = resolve_principal()
 
             if error:
                 return jsonify({'error': error}), 401
@@ -0,0 +1,90 @@
+# middleware/compression.py
+
+import gzip
+import mimetypes
+import os
+from flask import request, current_app, send_from_directory
+
+try:
+    import brotli  # pip install brotli (необязательно)
+except ImportError:
+    brotli = None
+
+
+def init_compression(app):
+    """
+    Подключение сжатия ответов
+
+    - JSON API и статика сжимаются на лету (gzip, br при наличии пакета brotli)
+    - для статики сначала ищется заранее сжатый файл (*.br, *.gz)
+    """
+    app.after_request(compress_response)
+
+    if app.has_static_folder:
+        app.view_functions['static'] = lambda filename: send_precompressed(app.static_folder, filename)
+
+
+def _supported_encodings():
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def send_precompressed(directory, filename):
+    """Отдать filename.br / filename.gz, если он есть и клиент его принимает"""
+    mimetype = mimetypes.guess_type(filename)[0]
+    suffixes = {'br': '.br', 'gzip': '.gz'}
+
+    for encoding in ['br', 'gzip']:
+        if not request.accept_encodings[encoding]:
+            continue
+
+        candidate = filename + suffixes[encoding]
+        if os.path.isfile(os.path.join(directory, candidate)):
+            response = send_from_directory(directory, candidate, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+
+    return send_from_directory(directory, filename)
+
+
+def compress_response(response):
+    """after_request: сжатие тела ответа по Accept-Encoding"""
+    config = current_app.config
+
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+
+    # Сжимаем только целые успешные ответы известной длины
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+
+    if response.content_length is None or response.content_length < config.get('COMPRESS_MIN_SIZE', 500):
+        return response
+
+    if response.mimetype not in config.get('COMPRESS_MIMETYPES', []):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = request.accept_encodings.best_match(_supported_encodings())
+    if not encoding:
+        return response
+
+    response.direct_passthrough = False
+    data = response.get_data()
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=config.get('COMPRESS_BR_LEVEL', 4))
+    else:
+        compressed = gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', 6))
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Accept-Ranges', None)
+
+    # Байты другие, поэтому сильный ETag становится слабым (как делает nginx)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
@@ -0,0 +1,40 @@
+# middleware/conditional.py
+
+import hashlib
+from flask import request, jsonify, make_response
+
+
+def make_etag(*parts):
+    """
+    Сильный ETag из версии данных (updated_at, количество строк, параметры запроса)
+
+    Вычисляется до загрузки и сериализации данных, поэтому при совпадении
+    ответ 304 обходится без полной выборки.
+    """
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def is_not_modified(etag):
+    """Клиент прислал If-None-Match с тем же ETag (сравнение слабое, RFC 7232)"""
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    """Пустой ответ 304 Not Modified"""
+    response = make_response('', 304)
+    return _with_validators(response, etag)
+
+
+def json_with_etag(payload, etag, status=200):
+    """JSON-ответ с ETag и обязательной ревалидацией"""
+    response = jsonify(payload)
+    response.status_code = status
+    return _with_validators(response, etag)
+
+
+def _with_validators(response, etag):
+    response.set_etag(etag)
+    # Данные зависят от пользователя: кэшировать только в браузере и всегда ревалидировать
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,161 @@
+# middleware/rate_limit.py
+
+import math
+import threading
+import time
+from flask import request, jsonify
+
+try:
+    import redis  # pip install redis (необязательно, общий счетчик для нескольких процессов)
+except ImportError:
+    redis = None
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def parse_limit(limit):
+    """'10/minute' -> (емкость корзины, пополнение в секунду)"""
+    count, period = limit.split('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()]
+
+
+class MemoryStore:
+    """Корзины токенов в памяти процесса"""
+
+    # При таком числе ключей полностью восстановленные корзины удаляются
+    CLEANUP_THRESHOLD = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (токены, время обновления, емкость, пополнение)
+
+    def consume(self, key, capacity, rate, cost=1):
+        """(разрешено, через сколько секунд повторить); cost=0 - только проверка"""
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - cost, now, capacity, rate)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now, capacity, rate)
+                allowed, retry_after = False, (1 - tokens) / rate
+
+            if len(self._buckets) > self.CLEANUP_THRESHOLD:
+                self._cleanup(now)
+
+        return allowed, retry_after
+
+    def _cleanup(self, now):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * bucket[3] < bucket[2]
+        }
+
+
+class RedisStore:
+    """Корзины токенов в Redis: один счетчик для всех воркеров и серверов"""
+
+    # Пополнение и списание атомарно на стороне Redis
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self._script(keys=[f'rate_limit:{key}'], args=[capacity, rate, time.time(), cost])
+        return bool(allowed), float(retry_after)
+
+
+def init_rate_limit(app):
+    """
+    Подключение ограничения частоты запросов
+
+    - RATE_LIMITS: лимит по IP на blueprint для изменяющих методов
+    - RATE_LIMIT_LOGIN: дополнительный лимит неудачных входов по логину (перебор
+      пароля с разных IP); успешный вход корзину не расходует, иначе чужие
+      запросы могли бы заблокировать вход владельцу логина
+    - RATE_LIMIT_STORAGE_URL: redis://... для общего хранилища, иначе память процесса
+    """
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+
+    url = app.config.get('RATE_LIMIT_STORAGE_URL')
+    if url and redis is not None:
+        store = RedisStore(url)
+    else:
+        if url:
+            print("⚠ Пакет redis не установлен - лимиты запросов хранятся в памяти процесса")
+        store = MemoryStore()
+
+    limits = {name: parse_limit(limit) for name, limit in app.config.get('RATE_LIMITS', {}).items()}
+    methods = set(app.config.get('RATE_LIMIT_METHODS', ()))
+    login_limit = app.config.get('RATE_LIMIT_LOGIN')
+    login_limit = parse_limit(login_limit) if login_limit else None
+
+    def login_key():
+        if not login_limit or request.endpoint != 'auth.login':
+            return None
+        data = request.get_json(silent=True) or {}
+        login = str(data.get('login', '')).strip().lower()
+        return f'login:{login}' if login else None
+
+    @app.before_request
+    def check_rate_limit():
+        checks = []
+
+        if request.blueprint in limits and request.method in methods:
+            checks.append((f'{request.blueprint}:ip:{request.remote_addr}', limits[request.blueprint], 1))
+
+        key = login_key()
+        if key:
+            # Только проверка: токен списывается после неудачного входа
+            checks.append((key, login_limit, 0))
+
+        for key, (capacity, rate), cost in checks:
+            allowed, retry_after = store.consume(key, capacity, rate, cost)
+            if not allowed:
+                return too_many_requests(retry_after)
+
+        return None
+
+    @app.after_request
+    def count_failed_login(response):
+        key = login_key()
+        if key and response.status_code == 401:
+            store.consume(key, *login_limit)
+        return response
+
+
+def too_many_requests(retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({'error': 'Слишком много запросов, повторите позже', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,118 @@
+# migrations/__init__.py
+"""
+Версионные миграции схемы БД
+
+Каждая миграция - модуль в migrations/versions с атрибутами VERSION, DESCRIPTION
+и функцией upgrade(connection). Примененные версии хранятся в таблице schema_version.
+Миграции пишутся идемпотентно (IF NOT EXISTS), чтобы их можно было применить
+и к базе, созданной скриптом technic_bd.sql.
+
+Запуск вручную:
+    python -m migrations status
+    python -m migrations upgrade
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+metadata = MetaData()
+
+schema_version = Table(
+    'schema_version',
+    metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# Ключ pg_advisory_lock: несколько воркеров не применяют миграции одновременно
+ADVISORY_LOCK_KEY = 7270901
+
+
+def load_migrations():
+    """Все миграции из migrations/versions по возрастанию версии"""
+    from migrations import versions
+
+    modules = [
+        importlib.import_module(f'{versions.__name__}.{name}')
+        for _, name, _ in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda module: module.VERSION)
+
+    numbers = [module.VERSION for module in modules]
+    if len(numbers) != len(set(numbers)):
+        raise RuntimeError(f'Повторяющиеся версии миграций: {numbers}')
+
+    return modules
+
+
+def applied_versions(connection):
+    schema_version.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(select(schema_version.c.version))}
+
+
+def pending_migrations(engine):
+    """Миграции, которые еще не применены к базе"""
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    return [module for module in load_migrations() if module.VERSION not in applied]
+
+
+def upgrade(engine):
+    """Применить недостающие миграции, каждую в отдельной транзакции"""
+    applied_now = []
+
+    with engine.connect() as lock_connection:
+        _lock(lock_connection)
+        try:
+            # Список пересчитывается под блокировкой: другой воркер мог успеть раньше
+            for migration in pending_migrations(engine):
+                with engine.begin() as connection:
+                    migration.upgrade(connection)
+                    connection.execute(schema_version.insert().values(
+                        version=migration.VERSION,
+                        description=migration.DESCRIPTION,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied_now.append(migration)
+        finally:
+            _unlock(lock_connection)
+
+    return applied_now
+
+
+def ensure_schema(app, engine):
+    """
+    Проверка версии схемы при старте приложения
+
+    MIGRATE_ON_STARTUP=True - недостающие миграции применяются автоматически,
+    иначе старт прерывается с подсказкой запустить миграции вручную.
+    """
+    pending = pending_migrations(engine)
+
+    if not pending:
+        return
+
+    if not app.config.get('MIGRATE_ON_STARTUP', True):
+        versions = ', '.join(f'{module.VERSION:04d}' for module in pending)
+        raise RuntimeError(
+            f'Схема БД устарела, не применены миграции: {versions}. '
+            f'Выполните: python -m migrations upgrade'
+        )
+
+    for migration in upgrade(engine):
+        print(f'✓ Миграция {migration.VERSION:04d}: {migration.DESCRIPTION}')
+
+
+def _lock(connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+
+
+def _unlock(connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+        connection.commit()
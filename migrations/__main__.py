@@ -0,0 +1,35 @@
+# migrations/__main__.py
+"""Запуск миграций без старта приложения: python -m migrations [status|upgrade]"""
+
+import sys
+from flask import Flask
+from database import db
+from migrations import load_migrations, pending_migrations, upgrade
+
+
+def main(command):
+    app = Flask(__name__)
+    app.config.from_object('config.Config')
+    db.init_app(app)
+
+    with app.app_context():
+        if command == 'status':
+            pending = {module.VERSION for module in pending_migrations(db.engine)}
+            for module in load_migrations():
+                mark = ' ' if module.VERSION in pending else '✓'
+                print(f'[{mark}] {module.VERSION:04d} {module.DESCRIPTION}')
+        elif command == 'upgrade':
+            applied = upgrade(db.engine)
+            for module in applied:
+                print(f'✓ Миграция {module.VERSION:04d}: {module.DESCRIPTION}')
+            if not applied:
+                print('Схема БД актуальна')
+        else:
+            print('Использование: python -m migrations [status|upgrade]')
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else 'status'))
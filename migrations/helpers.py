@@ -0,0 +1,17 @@
+# migrations/helpers.py
+"""Общие функции для идемпотентных миграций"""
+
+from sqlalchemy import inspect, text
+
+
+def is_postgresql(connection):
+    return connection.dialect.name == 'postgresql'
+
+
+def has_column(connection, table, column):
+    return column in {col['name'] for col in inspect(connection).get_columns(table)}
+
+
+def execute_all(connection, statements):
+    for statement in statements:
+        connection.execute(text(statement))
@@ -0,0 +1 @@
+# Модули миграций: vNNNN_<описание>.py
@@ -0,0 +1,59 @@
+"""Исходная схема: users, repair_requests, comments (как до введения миграций)"""
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, func
+from migrations.helpers import execute_all
+
+VERSION = 1
+DESCRIPTION = 'Исходная схема: users, repair_requests, comments'
+
+# Замороженное описание таблиц на момент миграции (не зависит от models/)
+metadata = MetaData()
+
+users = Table(
+    'users',
+    metadata,
+    Column('user_id', Integer, primary_key=True, autoincrement=True),
+    Column('full_name', String(100), nullable=False),
+    Column('phone', String(20), nullable=False),
+    Column('login', String(50), unique=True, nullable=False),
+    Column('password', String(255), nullable=False),
+    Column('user_type', String(50), nullable=False)
+)
+
+repair_requests = Table(
+    'repair_requests',
+    metadata,
+    Column('request_id', Integer, primary_key=True, autoincrement=True),
+    Column('start_date', Date, nullable=False),
+    Column('tech_type', String(100), nullable=False),
+    Column('tech_model', String(150), nullable=False),
+    Column('problem_description', Text, nullable=False),
+    Column('request_status', String(50), nullable=False),
+    Column('completion_date', Date),
+    Column('repair_parts', String(255)),
+    Column('master_id', Integer, ForeignKey('users.user_id')),
+    Column('client_id', Integer, ForeignKey('users.user_id'), nullable=False)
+)
+
+comments = Table(
+    'comments',
+    metadata,
+    Column('comment_id', Integer, primary_key=True, autoincrement=True),
+    Column('message', Text, nullable=False),
+    Column('master_id', Integer, ForeignKey('users.user_id'), nullable=False),
+    Column('request_id', Integer, ForeignKey('repair_requests.request_id'), nullable=False),
+    Column('created_at', DateTime, server_default=func.now())
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+
+    # Индексы из technic_bd.sql
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_users_type ON users(user_type)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_status ON repair_requests(request_status)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_master ON repair_requests(master_id)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_client ON repair_requests(client_id)',
+        'CREATE INDEX IF NOT EXISTS idx_comments_request ON comments(request_id)',
+    ])
@@ -0,0 +1,22 @@
+"""repair_requests.updated_at - версия строки для ETag"""
+
+from migrations.helpers import execute_all, has_column, is_postgresql
+
+VERSION = 2
+DESCRIPTION = 'Колонка repair_requests.updated_at'
+
+
+def upgrade(connection):
+    if has_column(connection, 'repair_requests', 'updated_at'):
+        return
+
+    if is_postgresql(connection):
+        execute_all(connection, [
+            'ALTER TABLE repair_requests ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP',
+        ])
+    else:
+        # SQLite не принимает непостоянный DEFAULT в ADD COLUMN
+        execute_all(connection, [
+            'ALTER TABLE repair_requests ADD COLUMN updated_at TIMESTAMP',
+            'UPDATE repair_requests SET updated_at = CURRENT_TIMESTAMP',
+        ])
@@ -0,0 +1,28 @@
+"""Индексы для курсорной пагинации и поиска по заявкам"""
+
+from migrations.helpers import execute_all, is_postgresql
+
+VERSION = 3
+DESCRIPTION = 'Индексы списка заявок и полнотекстового поиска'
+
+
+def upgrade(connection):
+    # ORDER BY start_date DESC, request_id DESC - порядок списка и ключ курсора
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_requests_start_date_id '
+        'ON repair_requests(start_date DESC, request_id DESC)',
+    ])
+
+    if not is_postgresql(connection):
+        return
+
+    # Выражение должно совпадать с models.repair_request.search_document
+    execute_all(connection, [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        "CREATE INDEX IF NOT EXISTS idx_requests_search ON repair_requests USING gin ("
+        "to_tsvector('russian'::regconfig, "
+        "coalesce(tech_type, '') || ' ' || coalesce(tech_model, '') || ' ' || "
+        "coalesce(problem_description, '') || ' ' || coalesce(repair_parts, '')))",
+        'CREATE INDEX IF NOT EXISTS idx_requests_tech_model_trgm '
+        'ON repair_requests USING gin (tech_model gin_trgm_ops)',
+    ])
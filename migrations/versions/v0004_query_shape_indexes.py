@@ -0,0 +1,33 @@
+"""Составные и частичные индексы под реальные запросы"""
+
+from migrations.helpers import execute_all
+
+VERSION = 4
+DESCRIPTION = 'Составные индексы под выборки по ролям, статусам и нагрузке'
+
+# Активные статусы заявки (предикат частичного индекса нагрузки мастеров)
+ACTIVE_STATUSES = "('Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих')"
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        # Заказчик: client_id = ? ORDER BY start_date DESC, request_id DESC
+        'CREATE INDEX IF NOT EXISTS idx_requests_client_start '
+        'ON repair_requests(client_id, start_date DESC, request_id DESC)',
+        # Мастер: master_id = ? ORDER BY start_date DESC, request_id DESC
+        'CREATE INDEX IF NOT EXISTS idx_requests_master_start '
+        'ON repair_requests(master_id, start_date DESC, request_id DESC)',
+        # Фильтр по статусу в списке
+        'CREATE INDEX IF NOT EXISTS idx_requests_status_start '
+        'ON repair_requests(request_status, start_date DESC, request_id DESC)',
+        # Нагрузка мастеров: master_id + request_status IN (активные)
+        'CREATE INDEX IF NOT EXISTS idx_requests_master_active '
+        f'ON repair_requests(master_id, request_status) WHERE request_status IN {ACTIVE_STATUSES}',
+        # Комментарии заявки по дате
+        'CREATE INDEX IF NOT EXISTS idx_comments_request_created '
+        'ON comments(request_id, created_at DESC)',
+        # Одноколоночные индексы стали префиксами составных
+        'DROP INDEX IF EXISTS idx_requests_client',
+        'DROP INDEX IF EXISTS idx_requests_master',
+        'DROP INDEX IF EXISTS idx_comments_request',
+    ])
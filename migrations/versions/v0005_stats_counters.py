@@ -0,0 +1,44 @@
+"""Таблица stats_counters и ее первоначальное заполнение"""
+
+from migrations.helpers import execute_all, is_postgresql
+
+VERSION = 5
+DESCRIPTION = 'Инкрементальные счетчики статистики stats_counters'
+
+ACTIVE_STATUSES = "('Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих')"
+COMPLETED_STATUSES = "('Готова к выдаче', 'Завершена', 'Выполнена')"
+
+
+def upgrade(connection):
+    if is_postgresql(connection):
+        days = 'completion_date - start_date'
+    else:
+        days = 'CAST(julianday(completion_date) - julianday(start_date) AS INTEGER)'
+
+    execute_all(connection, [
+        'CREATE TABLE IF NOT EXISTS stats_counters ('
+        '    scope VARCHAR(30) NOT NULL,'
+        '    key VARCHAR(150) NOT NULL,'
+        '    value BIGINT NOT NULL DEFAULT 0,'
+        '    PRIMARY KEY (scope, key)'
+        ')',
+        'DELETE FROM stats_counters',
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'total', '', COUNT(*) FROM repair_requests",
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'status', request_status, COUNT(*) FROM repair_requests GROUP BY request_status",
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'tech_type', tech_type, COUNT(*) FROM repair_requests GROUP BY tech_type",
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'master_active', CAST(master_id AS VARCHAR(150)), COUNT(*) FROM repair_requests "
+        f"WHERE master_id IS NOT NULL AND request_status IN {ACTIVE_STATUSES} GROUP BY master_id",
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'master_completed', CAST(master_id AS VARCHAR(150)), COUNT(*) FROM repair_requests "
+        f"WHERE master_id IS NOT NULL AND request_status IN {COMPLETED_STATUSES} GROUP BY master_id",
+        "INSERT INTO stats_counters (scope, key, value) "
+        f"SELECT 'completion', 'days_sum', COALESCE(SUM({days}), 0) FROM repair_requests "
+        "WHERE completion_date IS NOT NULL AND start_date IS NOT NULL",
+        "INSERT INTO stats_counters (scope, key, value) "
+        "SELECT 'completion', 'count', COUNT(*) FROM repair_requests "
+        "WHERE completion_date IS NOT NULL AND start_date IS NOT NULL",
+    ])
@@ -0,0 +1,24 @@
+"""Дневные агрегаты заявок для временных рядов статистики"""
+
+from migrations.helpers import execute_all
+
+VERSION = 6
+DESCRIPTION = 'Дневной rollup stats_daily и отметки агрегированных дней'
+
+
+def upgrade(connection):
+    # Таблицы заполняет фоновая задача TimeseriesService.roll_up
+    execute_all(connection, [
+        'CREATE TABLE IF NOT EXISTS stats_daily ('
+        '    day DATE NOT NULL,'
+        '    tech_type VARCHAR(100) NOT NULL,'
+        '    created_count INTEGER NOT NULL DEFAULT 0,'
+        '    completed_count INTEGER NOT NULL DEFAULT 0,'
+        '    PRIMARY KEY (day, tech_type)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS stats_daily_days ('
+        '    day DATE PRIMARY KEY,'
+        '    rolled_up_at TIMESTAMP NOT NULL'
+        ')',
+        'CREATE INDEX IF NOT EXISTS idx_requests_completion_date ON repair_requests(completion_date)',
+    ])
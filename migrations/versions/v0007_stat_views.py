@@ -0,0 +1,43 @@
+"""Материализованное представление времени выполнения заявок"""
+
+from migrations.helpers import execute_all, is_postgresql
+
+VERSION = 7
+DESCRIPTION = 'mv_completion_times и время обновления представлений'
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        'CREATE TABLE IF NOT EXISTS stat_view_refreshes ('
+        '    view_name VARCHAR(63) PRIMARY KEY,'
+        '    refreshed_at TIMESTAMP NOT NULL'
+        ')',
+    ])
+
+    if not is_postgresql(connection):
+        return
+
+    # Одна строка на разрез: все заявки, каждый тип техники, каждый мастер.
+    # Уникальный индекс обязателен для REFRESH MATERIALIZED VIEW CONCURRENTLY.
+    execute_all(connection, [
+        'CREATE MATERIALIZED VIEW IF NOT EXISTS mv_completion_times AS '
+        'SELECT '
+        "    CASE WHEN GROUPING(tech_type) = 0 THEN 'tech_type' "
+        "         WHEN GROUPING(master_id) = 0 THEN 'master' "
+        "         ELSE 'all' END AS group_type, "
+        "    COALESCE(tech_type, CAST(master_id AS VARCHAR), '') AS group_key, "
+        '    tech_type, '
+        '    master_id, '
+        '    AVG(completion_date - start_date) AS avg_days, '
+        '    percentile_cont(0.5) WITHIN GROUP (ORDER BY completion_date - start_date) AS p50_days, '
+        '    percentile_cont(0.9) WITHIN GROUP (ORDER BY completion_date - start_date) AS p90_days, '
+        '    COUNT(*) AS completed_count '
+        'FROM repair_requests '
+        'WHERE completion_date IS NOT NULL AND start_date IS NOT NULL '
+        'GROUP BY GROUPING SETS ((), (tech_type), (master_id))',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_completion_times_group '
+        'ON mv_completion_times(group_type, group_key)',
+        'INSERT INTO stat_view_refreshes (view_name, refreshed_at) '
+        "VALUES ('mv_completion_times', now() AT TIME ZONE 'utc') "
+        'ON CONFLICT (view_name) DO NOTHING',
+    ])
@@ -0,0 +1,21 @@
+"""Отметка просроченных заявок и индекс активных заявок по дате"""
+
+from migrations.helpers import execute_all, has_column
+
+VERSION = 8
+DESCRIPTION = 'Колонка repair_requests.overdue_since и индекс активных заявок по start_date'
+
+ACTIVE_STATUSES = "('Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих')"
+
+
+def upgrade(connection):
+    if not has_column(connection, 'repair_requests', 'overdue_since'):
+        execute_all(connection, [
+            'ALTER TABLE repair_requests ADD COLUMN overdue_since DATE',
+        ])
+
+    # /api/requests/overdue и задача отметки: start_date < срок среди активных заявок
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_requests_active_start '
+        f'ON repair_requests(start_date, request_id) WHERE request_status IN {ACTIVE_STATUSES}',
+    ])
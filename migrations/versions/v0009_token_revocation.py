@@ -0,0 +1,24 @@
+"""Отзыв JWT: отдельные токены по jti и все токены пользователя до момента"""
+
+from migrations.helpers import execute_all
+
+VERSION = 9
+DESCRIPTION = 'Таблицы revoked_tokens и user_token_cutoffs'
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        'CREATE TABLE IF NOT EXISTS revoked_tokens ('
+        '    jti VARCHAR(64) PRIMARY KEY,'
+        '    user_id INTEGER,'
+        '    expires_at TIMESTAMP NOT NULL,'
+        '    revoked_at TIMESTAMP NOT NULL'
+        ')',
+        # Очистка истекших записей
+        'CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires_at)',
+        # Токены пользователя с iat < revoked_before недействительны
+        'CREATE TABLE IF NOT EXISTS user_token_cutoffs ('
+        '    user_id INTEGER PRIMARY KEY,'
+        '    revoked_before TIMESTAMP NOT NULL'
+        ')',
+    ])
@@ -0,0 +1,29 @@
+"""Версии строк в UTC: users.updated_at и UTC-умолчание repair_requests.updated_at"""
+
+from migrations.helpers import execute_all, has_column, is_postgresql
+
+VERSION = 10
+DESCRIPTION = 'Колонка users.updated_at, умолчания updated_at в UTC'
+
+
+def upgrade(connection):
+    # ORM пишет datetime.utcnow(), поэтому и умолчания в БД должны быть в UTC:
+    # иначе на сервере не в UTC max(updated_at) может не расти при изменениях
+    if is_postgresql(connection):
+        execute_all(connection, [
+            "ALTER TABLE repair_requests ALTER COLUMN updated_at SET DEFAULT (now() AT TIME ZONE 'utc')",
+        ])
+
+    if has_column(connection, 'users', 'updated_at'):
+        return
+
+    if is_postgresql(connection):
+        execute_all(connection, [
+            "ALTER TABLE users ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')",
+        ])
+    else:
+        # CURRENT_TIMESTAMP в SQLite - UTC; непостоянный DEFAULT в ADD COLUMN не поддерживается
+        execute_all(connection, [
+            'ALTER TABLE users ADD COLUMN updated_at TIMESTAMP',
+            'UPDATE users SET updated_at = CURRENT_TIMESTAMP',
+        ])
@@ -11,11 +11,15 @@ class Comment(db.Model):
     request_id = db.Column(db.Integer, db.ForeignKey('repair_requests.request_id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'comment_id': self.comment_id,
-            'message': self.message,
-            'master_id': self.master_id,
-            'request_id': self.request_id,
-            'created_at': str(self.created_at) if self.created_at else None
-        }
+    # Поля JSON-представления
+    FIELDS = ('comment_id', 'message', 'master_id', 'request_id', 'created_at')
+
+    def to_dict(self, fields=None):
+        """fields - подмножество FIELDS"""
+        result = {}
+        for field in self.FIELDS if fields is None else fields:
+            value = getattr(self, field)
+            if field == 'created_at':
+                value = str(value) if value else None
+            result[field] = value
+        return result
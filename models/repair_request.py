@@ -1,5 +1,41 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import func, literal_column
+
+# Статусы, которые можно установить через API
+REQUEST_STATUSES = [
+    'Новая заявка',
+    'В процессе ремонта',
+    'Готова к выдаче',
+    'Ожидание запчастей',
+    'Завершена'
+]
+
+# Единые наборы статусов для выборок и статистики.
+# Схема БД допускает оба варианта статуса ожидания и 'Выполнена' (для совместимости)
+ACTIVE_STATUSES = ['Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих']
+COMPLETED_STATUSES = ['Готова к выдаче', 'Завершена', 'Выполнена']
+
+# Конфигурация полнотекстового поиска (русская морфология)
+SEARCH_CONFIG = literal_column("'russian'::regconfig")
+
+
+def search_document(tech_type, tech_model, problem_description, repair_parts):
+    """tsvector по текстовым полям заявки.
+
+    Выражение в запросе должно совпадать с выражением GIN-индекса idx_requests_search
+    (migrations/versions/v0003) символ в символ, поэтому константы передаются
+    как literal_column, а не как параметры.
+    """
+    empty = literal_column("''")
+    space = literal_column("' '")
+    return func.to_tsvector(
+        SEARCH_CONFIG,
+        func.coalesce(tech_type, empty) + space
+        + func.coalesce(tech_model, empty) + space
+        + func.coalesce(problem_description, empty) + space
+        + func.coalesce(repair_parts, empty)
+    )
 
 
 class RepairRequest(db.Model):
@@ -15,17 +51,39 @@ class RepairRequest(db.Model):
     repair_parts = db.Column(db.String(255))
     master_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     client_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    # Версия строки для ETag (UTC): меняется при каждом UPDATE через ORM,
+    # умолчание в БД - now() AT TIME ZONE 'utc' (migrations/versions/v0010)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Дата, когда фоновая задача отметила заявку просроченной (SlaService)
+    overdue_since = db.Column(db.Date)
+
+    @classmethod
+    def search_vector(cls):
+        """tsvector для запросов (совпадает с idx_requests_search)"""
+        return search_document(cls.tech_type, cls.tech_model, cls.problem_description, cls.repair_parts)
+
+    # Поля JSON-представления (порядок сохраняется)
+    FIELDS = (
+        'request_id',
+        'start_date',
+        'tech_type',
+        'tech_model',
+        'problem_description',
+        'request_status',
+        'completion_date',
+        'repair_parts',
+        'master_id',
+        'client_id',
+        'overdue_since'
+    )
+    DATE_FIELDS = ('start_date', 'completion_date', 'overdue_since')
 
-    def to_dict(self):
-        return {
-            'request_id': self.request_id,
-            'start_date': str(self.start_date) if self.start_date else None,
-            'tech_type': self.tech_type,
-            'tech_model': self.tech_model,
-            'problem_description': self.problem_description,
-            'request_status': self.request_status,
-            'completion_date': str(self.completion_date) if self.completion_date else None,
-            'repair_parts': self.repair_parts,
-            'master_id': self.master_id,
-            'client_id': self.client_id
-        }
+    def to_dict(self, fields=None):
+        """fields - подмножество FIELDS; обращаемся только к запрошенным атрибутам"""
+        result = {}
+        for field in self.FIELDS if fields is None else fields:
+            value = getattr(self, field)
+            if field in self.DATE_FIELDS:
+                value = str(value) if value else None
+            result[field] = value
+        return result
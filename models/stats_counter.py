@@ -0,0 +1,28 @@
+from database import db
+
+
+class StatsCounter(db.Model):
+    """
+    Счетчик статистики, обновляемый в той же транзакции, что и заявки
+
+    scope / key:
+        total / ''                 - всего заявок
+        status / <статус>          - заявок в статусе
+        tech_type / <тип техники>  - заявок по типу техники
+        master_active / <id>       - активных заявок мастера
+        master_completed / <id>    - выполненных заявок мастера
+        completion / days_sum      - сумма дней выполнения
+        completion / count         - количество заявок с датой завершения
+    """
+    __tablename__ = 'stats_counters'
+
+    scope = db.Column(db.String(30), primary_key=True)
+    key = db.Column(db.String(150), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'key': self.key,
+            'value': self.value
+        }
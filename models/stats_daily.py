@@ -0,0 +1,27 @@
+from database import db
+
+
+class StatsDaily(db.Model):
+    """Заявки за закрытый день по типу техники: поступившие (start_date) и выполненные (completion_date)"""
+    __tablename__ = 'stats_daily'
+
+    day = db.Column(db.Date, primary_key=True)
+    tech_type = db.Column(db.String(100), primary_key=True)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'tech_type': self.tech_type,
+            'created_count': self.created_count,
+            'completed_count': self.completed_count
+        }
+
+
+class StatsDailyDay(db.Model):
+    """Отметка, что день уже агрегирован в stats_daily (в том числе день без заявок)"""
+    __tablename__ = 'stats_daily_days'
+
+    day = db.Column(db.Date, primary_key=True)
+    rolled_up_at = db.Column(db.DateTime, nullable=False)
@@ -1,4 +1,5 @@
 from database import db
+from datetime import datetime
 
 
 class User(db.Model):
@@ -10,13 +11,13 @@ class User(db.Model):
     login = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
     user_type = db.Column(db.String(50), nullable=False)
+    # Версия строки (UTC): имена пользователей входят в ETag списков заявок
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'user_id': self.user_id,
-            'full_name': self.full_name,
-            'phone': self.phone,
-            'login': self.login,
-            'user_type': self.user_type
-        }
+    # Поля JSON-представления (пароль никогда не отдается)
+    FIELDS = ('user_id', 'full_name', 'phone', 'login', 'user_type')
+
+    def to_dict(self, fields=None):
+        """fields - подмножество FIELDS"""
+        return {field: getattr(self, field) for field in (self.FIELDS if fields is None else fields)}
 
@@ -1,78 +1,55 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-import jwt
-import os
-from models.user import User
-from database import db
-from werkzeug.security import check_password_hash
+from middleware.auth_middleware import require_role
+from services.auth_service import AuthService
+from services.token_cache import TokenCache
+from services.token_revocation import TokenRevocation
+from services.user_identity_map import UserIdentityMap
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
-SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Вход пользователя и возврат JWT токена"""
-    try:
-        data = request.get_json()
-        if not data or not data.get('login') or not data.get('password'):
-            return jsonify({'error': 'Missing login or password'}), 400
+    data = request.get_json(silent=True)
+    if not data or not data.get('login') or not data.get('password'):
+        return jsonify({'error': 'Missing login or password'}), 400
 
-        login_str = data.get('login')
-        password = data.get('password')
+    result, status = AuthService.login_user(data['login'], data['password'])
+    response = jsonify(result)
 
-        # Поиск пользователя по логину
-        user = User.query.filter_by(login=login_str).first()
+    # Очередь проверки паролей заполнена
+    if status == 503:
+        response.headers['Retry-After'] = str(result['retry_after'])
 
-        if not user:
-            return jsonify({'error': 'Invalid login or password'}), 401
-
-        # ✅ УНИВЕРСАЛЬНАЯ проверка пароля (хеш ИЛИ открытый текст)
-        password_valid = False
-
-        # Если пароль похож на хеш (длинный) - проверяем через check_password_hash
-        if len(user.password) > 50:  # Хеши обычно длиннее 50 символов
-            password_valid = check_password_hash(user.password, password)
-        else:
-            # Старый формат - открытый текст
-            password_valid = (user.password == password)
-
-        if not password_valid:
-            return jsonify({'error': 'Invalid login or password'}), 401
-
-        # Генерация JWT токена
-        token_payload = {
-            'user_id': user.user_id,
-            'login': user.login,
-            'full_name': user.full_name,
-            'user_type': user.user_type,
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }
-
-        token = jwt.encode(token_payload, SECRET_KEY, algorithm='HS256')
-
-        return jsonify({
-            'access_token': token,
-            'user_id': user.user_id,
-            'login': user.login,
-            'full_name': user.full_name,
-            'user_type': user.user_type
-        }), 200
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return response, status
 
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
     """Выход пользователя"""
     try:
+        # Токен отзывается и больше не берется из кэша проверенных токенов
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+            payload, error = AuthService.verify_token(token)
+            if payload:
+                TokenRevocation.revoke_token(payload)
+            TokenCache.evict_token(token)
+
         return jsonify({'message': 'Logout successful'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@auth_bp.route('/token-cache', methods=['GET'])
+@require_role('Менеджер')
+def token_cache_stats(current_user):
+    """Счетчики кэша проверенных токенов"""
+    return jsonify(TokenCache.stats()), 200
+
+
 @auth_bp.route('/refresh', methods=['POST'])
 def refresh_token():
     """Обновить JWT токен"""
@@ -83,28 +60,17 @@ def refresh_token():
         if not token:
             return jsonify({'error': 'Missing token'}), 400
 
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        # Проверка подписи, срока и отзыва
+        payload, error = AuthService.verify_token(token)
+        if error:
+            return jsonify({'error': error}), 401
 
         # Получаем обновленную информацию пользователя
-        user = User.query.get(payload['user_id'])
+        user = UserIdentityMap.get(payload['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        new_token_payload = {
-            'user_id': user.user_id,
-            'login': user.login,
-            'full_name': user.full_name,
-            'user_type': user.user_type,
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }
-
-        new_token = jwt.encode(new_token_payload, SECRET_KEY, algorithm='HS256')
-
-        return jsonify({'access_token': new_token}), 200
+        return jsonify({'access_token': AuthService.generate_token(user)}), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token has expired'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Invalid token'}), 401
     except Exception as e:
         return jsonify({'error': str(e)}), 500
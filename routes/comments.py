@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
 from models.comment import Comment
-from models.user import User
 from database import db
+from services.fieldsets import parse_fields
+from services.user_identity_map import UserIdentityMap
+from sqlalchemy.orm import load_only
 from datetime import datetime
 import traceback
 
 comments_bp = Blueprint('comments', __name__, url_prefix='/api/comments')
 
+# Поля, доступные в fields= (master_name вычисляется по master_id)
+COMMENT_FIELDS = Comment.FIELDS + ('master_name',)
+
 @comments_bp.route('/', methods=['POST'])
 @require_auth
 def create_comment(current_user):
@@ -43,7 +48,7 @@ def create_comment(current_user):
         db.session.commit()
 
         # Вернуть данные комментария с именем автора
-        user = User.query.get(new_comment.master_id)
+        user = UserIdentityMap.get(new_comment.master_id)
 
         comment_data = {
             'comment_id': new_comment.comment_id,
@@ -85,26 +90,42 @@ def get_comments(current_user):
         except ValueError:
             return jsonify({'error': 'request_id must be a number'}), 400
 
+        # Выборочные поля: незапрошенные колонки не читаются из БД
+        try:
+            fields = parse_fields(request.args.get('fields'), COMMENT_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        with_master_name = fields is None or 'master_name' in fields
+        model_fields = None if fields is None else [f for f in fields if f in Comment.FIELDS]
+
+        query = Comment.query.filter_by(request_id=request_id)
+
+        if model_fields is not None:
+            columns = set(model_fields) | ({'master_id'} if with_master_name else set())
+            query = query.options(load_only(*[getattr(Comment, column) for column in columns]))
+
         # Получить комментарии с сортировкой по дате
         # Проверяем, какое поле есть в модели: created_at или comment_date
         if hasattr(Comment, 'created_at'):
-            comments = Comment.query.filter_by(request_id=request_id).order_by(Comment.created_at.desc()).all()
+            comments = query.order_by(Comment.created_at.desc()).all()
         else:
-            comments = Comment.query.filter_by(request_id=request_id).all()
+            comments = query.all()
+
+        # Авторы всех комментариев - одним запросом при первом обращении
+        if with_master_name:
+            UserIdentityMap.prefetch(comment.master_id for comment in comments)
 
         result = []
         for comment in comments:
-            # Получить пользователя
-            user = User.query.get(comment.master_id)
-
-            comment_data = {
-                'comment_id': comment.comment_id,
-                'message': comment.message,
-                'master_id': comment.master_id,
-                'request_id': comment.request_id,
-                'created_at': comment.created_at.isoformat() if hasattr(comment, 'created_at') and comment.created_at else None,
-                'master_name': user.full_name if user else 'Неизвестно'
-            }
+            comment_data = comment.to_dict(model_fields)
+
+            if 'created_at' in comment_data:
+                comment_data['created_at'] = comment.created_at.isoformat() if comment.created_at else None
+
+            if with_master_name:
+                user = UserIdentityMap.get(comment.master_id)
+                comment_data['master_name'] = user.full_name if user else 'Неизвестно'
 
             result.append(comment_data)
 
@@ -1,12 +1,52 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from middleware.auth_middleware import require_auth
-from models.repair_request import RepairRequest
-from models.user import User
+from middleware.conditional import make_etag, is_not_modified, not_modified, json_with_etag
+from models.repair_request import RepairRequest, REQUEST_STATUSES, COMPLETED_STATUSES
+from services.request_query_service import RequestQueryService
+from services.export_service import ExportService
+from services.fieldsets import parse_fields
+from services.stat_cache import StatisticsCache
+from services.stats_counter_service import StatsCounterService
+from services.master_assignment import MasterAssignment
+from services.sla_service import SlaService
+from services.user_identity_map import UserIdentityMap
 from database import db
+from sqlalchemy import func, update
 from datetime import date, datetime
+import math
 
 requests_bp = Blueprint('requests', __name__, url_prefix='/api/requests')
 
+# Поля, доступные для массового обновления, и максимальный размер пакета
+BULK_UPDATE_FIELDS = ['request_status', 'master_id', 'repair_parts']
+BULK_UPDATE_LIMIT = 1000
+OVERDUE_LIMIT = 1000
+MAX_PAGE_SIZE = 500
+
+
+def parse_master_id(master_id):
+    """
+    (master_id, ошибка): пустое значение - (None, None), иначе id мастера
+
+    Фронтенд передает id из <select> строкой, поэтому "2" допустимо.
+    """
+    if not master_id:
+        return None, None
+
+    if isinstance(master_id, bool):
+        return None, 'master_id должен быть числом'
+
+    try:
+        master_id = int(master_id)
+    except (ValueError, TypeError):
+        return None, 'master_id должен быть числом'
+
+    master = UserIdentityMap.get(master_id)
+    if not master or master.user_type != 'Мастер':
+        return None, 'Мастер не найден'
+
+    return master_id, None
+
 
 @requests_bp.route('/', methods=['GET'])
 @require_auth
@@ -17,104 +57,219 @@ def get_all_requests(current_user):
         limit = request.args.get('limit', 50, type=int)
         status = request.args.get('status', None)
         search = request.args.get('search', None)
+        cursor = request.args.get('cursor', None)
+        with_total = request.args.get('with_total', 'false').lower() in ('1', 'true', 'yes')
 
-        query = RepairRequest.query
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit должен быть от 1 до {MAX_PAGE_SIZE}'}), 400
 
-        # Фильтрация по роли
-        if current_user.get('user_type') == 'Заказчик':
-            query = query.filter_by(client_id=current_user.get('user_id'))
+        # Стратегия подсчета total: exact | estimate | none
+        # (по умолчанию exact для страниц и none для курсора)
+        count_strategy = request.args.get('count') or ('exact' if cursor is None or with_total else 'none')
+        if count_strategy not in RequestQueryService.COUNT_STRATEGIES:
+            return jsonify({'error': f"count должен быть одним из: {', '.join(RequestQueryService.COUNT_STRATEGIES)}"}), 400
 
-        if current_user.get('user_type') == 'Мастер':
-            query = query.filter_by(master_id=current_user.get('user_id'))
+        # Выборочные поля: незапрошенные колонки не читаются из БД
+        try:
+            fields = parse_fields(request.args.get('fields'), RequestQueryService.available_fields())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = RequestQueryService.base_query(fields)
+
+        # Фильтрация по роли
+        query = RequestQueryService.scope_to_user(query, current_user)
 
         # Фильтрация по статусу
         if status:
-            query = query.filter_by(request_status=status)
+            query = query.filter(RepairRequest.request_status == status)
 
-        # Поиск по ID
+        # Поиск по номеру и тексту заявки (в курсорном режиме - без ранжирования)
         if search:
-            try:
-                query = query.filter_by(request_id=int(search))
-            except ValueError:
-                pass
+            query = RequestQueryService.apply_search(query, search, ranked=cursor is None)
+
+        etag_parts = ('requests', current_user.get('user_id'), current_user.get('user_type'), request.full_path)
+        etag = None
+        total = None
+
+        if count_strategy == 'exact':
+            # Версия выборки и точное количество - одним агрегатом до загрузки страницы
+            total, last_update = RequestQueryService.list_version(query)
+            etag = make_etag(*etag_parts, total, last_update, *RequestQueryService.users_version())
+            if is_not_modified(etag):
+                return not_modified(etag)
+        elif count_strategy == 'estimate':
+            total, count_strategy = RequestQueryService.estimate_count(query)
 
         # Сортировка по дате (новые первые)
-        query = query.order_by(RepairRequest.start_date.desc())
+        query = RequestQueryService.order_newest_first(query)
+
+        # Курсорная пагинация: стоимость страницы не зависит от её номера
+        if cursor is not None:
+            position = None
+            if cursor:
+                try:
+                    position = RequestQueryService.decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+
+            if position:
+                query = RequestQueryService.after_cursor(query, position)
+
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = RequestQueryService.encode_cursor(rows[-1][0]) if has_more else None
+
+            pagination = {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'total': total,
+                'count_strategy': count_strategy
+            }
+        else:
+            # Пагинация (COUNT выполнен выше согласно стратегии)
+            paginated = query.paginate(page=page, per_page=limit, error_out=False, count=False)
+            rows = paginated.items
+
+            pagination = {
+                'page': page,
+                'limit': limit,
+                'total': total,
+                'pages': math.ceil(total / paginated.per_page) if total is not None else None,
+                'count_strategy': count_strategy
+            }
 
-        # Пагинация
-        paginated = query.paginate(page=page, per_page=limit, error_out=False)
+        # Без точного подсчета ETag строится по версиям строк страницы и курсору
+        # следующей: строка после последней страницы меняет ответ при тех же строках
+        if etag is None:
+            etag = make_etag(
+                *etag_parts, total, pagination.get('next_cursor'),
+                *RequestQueryService.page_version(rows)
+            )
+            if is_not_modified(etag):
+                return not_modified(etag)
+
+        # Имена мастеров и клиентов уже получены в том же SELECT
+        return json_with_etag({
+            'data': [RequestQueryService.row_to_dict(row, fields) for row in rows],
+            'pagination': pagination
+        }, etag)
 
-        # Формирование результата с именами мастеров и клиентов
-        result = []
-        for req in paginated.items:
-            req_dict = req.to_dict()
-
-            # Добавить имя мастера
-            if req.master_id:
-                master = User.query.get(req.master_id)
-                if master:
-                    req_dict['master_name'] = master.full_name
-            else:
-                req_dict['master_name'] = None
-
-            # Добавить имя клиента
-            if req.client_id:
-                client = User.query.get(req.client_id)
-                if client:
-                    req_dict['client_name'] = client.full_name
-            else:
-                req_dict['client_name'] = None
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+
+@requests_bp.route('/overdue', methods=['GET'])
+@require_auth
+def get_overdue_requests(current_user):
+    """Просроченные активные заявки (сроки - SLA_DAYS_DEFAULT / SLA_DAYS_BY_TECH_TYPE)"""
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        if limit < 1 or limit > OVERDUE_LIMIT:
+            return jsonify({'error': f'limit должен быть от 1 до {OVERDUE_LIMIT}'}), 400
+
+        query = RequestQueryService.scope_to_user(RequestQueryService.base_query(), current_user)
+        query = SlaService.overdue_query(query)
+
+        total = query.order_by(None).count()
+        today = date.today()
+
+        result = []
+        for row in query.limit(limit).all():
+            req_dict = RequestQueryService.row_to_dict(row)
+            due_date = SlaService.due_date(row[0])
+            req_dict['due_date'] = str(due_date)
+            req_dict['days_overdue'] = (today - due_date).days
             result.append(req_dict)
 
         return jsonify({
             'data': result,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': paginated.total,
-                'pages': paginated.pages
-            }
+            'total': total,
+            'limit': limit
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@requests_bp.route('/export', methods=['GET'])
+@require_auth
+def export_requests(current_user):
+    """Потоковая выгрузка заявок (CSV или NDJSON) с фильтрацией по роли и статусу"""
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        status = request.args.get('status', None)
+
+        if export_format not in ExportService.FORMATS:
+            return jsonify({'error': f"Формат должен быть одним из: {', '.join(ExportService.FORMATS)}"}), 400
+
+        query = RequestQueryService.scope_to_user(RequestQueryService.base_query(), current_user)
+
+        if status:
+            query = query.filter(RepairRequest.request_status == status)
+
+        query = RequestQueryService.order_newest_first(query)
+
+        rows = ExportService.iter_rows(query)
+        if export_format == 'csv':
+            chunks = ExportService.iter_csv(rows)
+        else:
+            chunks = ExportService.iter_ndjson(rows)
+
+        headers = {
+            'Content-Disposition': f'attachment; filename=requests.{export_format}',
+            'Vary': 'Accept-Encoding'
+        }
+
+        # Сжатие на лету, если клиент его поддерживает
+        if request.accept_encodings['gzip']:
+            chunks = ExportService.gzip_stream(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=ExportService.FORMATS[export_format],
+            headers=headers
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @requests_bp.route('/<int:request_id>', methods=['GET'])
 @require_auth
 def get_request(request_id, current_user):
     """Получить одну заявку"""
     try:
-        req = RepairRequest.query.get(request_id)
+        # Сначала дешевая проверка версии без текстовых полей
+        version = RequestQueryService.get_version(request_id)
 
-        if not req:
+        if not version:
             return jsonify({'error': 'Заявка не найдена'}), 404
 
+        client_id, updated_at, master_name, client_name = version
+
         # Проверка доступа для Заказчика
-        if current_user.get('user_type') == 'Заказчик' and req.client_id != current_user.get('user_id'):
+        if current_user.get('user_type') == 'Заказчик' and client_id != current_user.get('user_id'):
             return jsonify({'error': 'Доступ запрещен'}), 403
 
-        # Получить данные заявки
-        req_dict = req.to_dict()
+        etag = make_etag(
+            'request', request_id, updated_at, master_name, client_name,
+            *RequestQueryService.users_version()
+        )
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        row = RequestQueryService.get_row(request_id)
 
-        # Добавить имя мастера
-        if req.master_id:
-            master = User.query.get(req.master_id)
-            if master:
-                req_dict['master_name'] = master.full_name
-        else:
-            req_dict['master_name'] = None
+        if not row:
+            return jsonify({'error': 'Заявка не найдена'}), 404
 
-        # Добавить имя клиента
-        if req.client_id:
-            client = User.query.get(req.client_id)
-            if client:
-                req_dict['client_name'] = client.full_name
-        else:
-            req_dict['client_name'] = None
+        # Данные заявки с именами мастера и клиента
+        req_dict = RequestQueryService.row_to_dict(row)
 
-        return jsonify({'data': req_dict}), 200
+        return json_with_etag({'data': req_dict}, etag)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -135,6 +290,17 @@ def create_request(current_user):
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Отсутствуют обязательные поля'}), 400
 
+        # master_id='auto' или auto_assign=true - наименее загруженный мастер
+        master_id = data.get('master_id')
+        if master_id == 'auto' or data.get('auto_assign'):
+            master_id = MasterAssignment.pick()
+            if master_id is None:
+                return jsonify({'error': 'Нет доступных мастеров для назначения'}), 409
+        else:
+            master_id, error = parse_master_id(master_id)
+            if error:
+                return jsonify({'error': error}), 400
+
         new_request = RepairRequest(
             start_date=date.today(),
             tech_type=data['tech_type'],
@@ -142,16 +308,18 @@ def create_request(current_user):
             problem_description=data['problem_description'],
             request_status='Новая заявка',
             client_id=data['client_id'],
-            master_id=data.get('master_id')
+            master_id=master_id
         )
 
         db.session.add(new_request)
         db.session.commit()
+        StatisticsCache.invalidate()
 
         return jsonify({
             'message': 'Заявка успешно создана',
             'request_id': new_request.request_id,
-            'request_status': new_request.request_status
+            'request_status': new_request.request_status,
+            'master_id': new_request.master_id
         }), 201
 
     except Exception as e:
@@ -176,23 +344,19 @@ def update_request(request_id, current_user):
 
         # Обновление статуса
         if 'request_status' in data and data['request_status']:
-            allowed_statuses = [
-                'Новая заявка',
-                'В процессе ремонта',
-                'Готова к выдаче',
-                'Ожидание запчастей',
-                'Завершена'
-            ]
-            if data['request_status'] in allowed_statuses:
+            if data['request_status'] in REQUEST_STATUSES:
                 req.request_status = data['request_status']
 
                 # Автоматически установить дату завершения
-                if data['request_status'] in ['Завершена', 'Готова к выдаче'] and not req.completion_date:
+                if data['request_status'] in COMPLETED_STATUSES and not req.completion_date:
                     req.completion_date = date.today()
 
         # Обновление мастера
         if 'master_id' in data:
-            req.master_id = data['master_id'] if data['master_id'] else None
+            master_id, error = parse_master_id(data['master_id'])
+            if error:
+                return jsonify({'error': error}), 400
+            req.master_id = master_id
 
         # Обновление запчастей
         if 'repair_parts' in data:
@@ -215,19 +379,10 @@ def update_request(request_id, current_user):
             req.completion_date = datetime.fromisoformat(data['completion_date']).date()
 
         db.session.commit()
+        StatisticsCache.invalidate()
 
         # Вернуть обновленные данные с именами
-        req_dict = req.to_dict()
-
-        if req.master_id:
-            master = User.query.get(req.master_id)
-            if master:
-                req_dict['master_name'] = master.full_name
-
-        if req.client_id:
-            client = User.query.get(req.client_id)
-            if client:
-                req_dict['client_name'] = client.full_name
+        req_dict = RequestQueryService.row_to_dict(RequestQueryService.get_row(request_id))
 
         return jsonify({
             'message': 'Заявка успешно обновлена',
@@ -239,6 +394,108 @@ def update_request(request_id, current_user):
         return jsonify({'error': str(e)}), 500
 
 
+@requests_bp.route('/bulk', methods=['PATCH'])
+@require_auth
+def bulk_update_requests(current_user):
+    """Массовое обновление статуса, мастера и запчастей одним UPDATE"""
+    try:
+        if current_user.get('user_type') not in ['Мастер', 'Менеджер', 'Оператор']:
+            return jsonify({'error': 'Недостаточно прав'}), 403
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Тело запроса должно быть JSON-объектом'}), 400
+
+        request_ids = data.get('request_ids')
+        changes = data.get('changes') or {}
+
+        if not isinstance(changes, dict):
+            return jsonify({'error': 'changes должен быть объектом'}), 400
+
+        if not isinstance(request_ids, list) or not request_ids:
+            return jsonify({'error': 'request_ids должен быть непустым списком'}), 400
+
+        if len(request_ids) > BULK_UPDATE_LIMIT:
+            return jsonify({'error': f'Не более {BULK_UPDATE_LIMIT} заявок за один запрос'}), 400
+
+        try:
+            request_ids = list(dict.fromkeys(int(request_id) for request_id in request_ids))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'request_ids должен содержать числа'}), 400
+
+        unknown_fields = set(changes) - set(BULK_UPDATE_FIELDS)
+        if not changes or unknown_fields:
+            return jsonify({'error': f"Можно изменить только: {', '.join(BULK_UPDATE_FIELDS)}"}), 400
+
+        values = {}
+
+        # Обновление статуса с автоматической датой завершения (как в PUT)
+        if 'request_status' in changes:
+            if changes['request_status'] not in REQUEST_STATUSES:
+                return jsonify({'error': 'Недопустимый статус'}), 400
+
+            values[RepairRequest.request_status] = changes['request_status']
+
+            if changes['request_status'] in COMPLETED_STATUSES:
+                values[RepairRequest.completion_date] = func.coalesce(RepairRequest.completion_date, date.today())
+
+        if 'master_id' in changes:
+            master_id, error = parse_master_id(changes['master_id'])
+            if error:
+                return jsonify({'error': error}), 400
+            values[RepairRequest.master_id] = master_id
+
+        if 'repair_parts' in changes:
+            values[RepairRequest.repair_parts] = changes['repair_parts']
+
+        values[RepairRequest.updated_at] = datetime.utcnow()
+
+        # Найденные заявки (с полями для счетчиков статистики) блокируются до commit,
+        # чтобы счетчики считались от тех версий строк, которые перезапишет UPDATE
+        found = StatsCounterService.locked_states(db.session.connection(), request_ids)
+        found_ids = set(found)
+
+        if found_ids:
+            db.session.execute(
+                update(RepairRequest)
+                .where(RepairRequest.request_id.in_(found_ids))
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+
+            # UPDATE идет в обход ORM, поэтому счетчики обновляются явно
+            counter_changes = []
+            for old_state in found.values():
+                new_state = dict(old_state)
+                if 'request_status' in changes:
+                    new_state['request_status'] = changes['request_status']
+                    if changes['request_status'] in COMPLETED_STATUSES and not new_state['completion_date']:
+                        new_state['completion_date'] = date.today()
+                if 'master_id' in changes:
+                    new_state['master_id'] = master_id
+                counter_changes.append((old_state, new_state))
+
+            StatsCounterService.apply_changes(db.session, counter_changes)
+
+        db.session.commit()
+        StatisticsCache.invalidate()
+
+        results = [
+            {'request_id': request_id, 'result': 'updated' if request_id in found_ids else 'not_found'}
+            for request_id in request_ids
+        ]
+
+        return jsonify({
+            'message': f'Обновлено заявок: {len(found_ids)}',
+            'updated': len(found_ids),
+            'results': results
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @requests_bp.route('/<int:request_id>', methods=['DELETE'])
 @require_auth
 def delete_request(request_id, current_user):
@@ -254,6 +511,7 @@ def delete_request(request_id, current_user):
 
         db.session.delete(req)
         db.session.commit()
+        StatisticsCache.invalidate()
 
         return jsonify({
             'message': 'Заявка успешно удалена',
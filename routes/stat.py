@@ -1,5 +1,10 @@
-from flask import Blueprint, jsonify
+from datetime import date, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
 from services.stat_service import StatisticsService
+from services.stat_cache import StatisticsCache
+from services.timeseries_service import TimeseriesService
+from services.cube_service import CubeService
 
 statistics_bp = Blueprint('statistics', __name__, url_prefix='/api/statistics')
 
@@ -8,21 +13,7 @@ statistics_bp = Blueprint('statistics', __name__, url_prefix='/api/statistics')
 def get_all_statistics():
     """Получить всю статистику"""
     try:
-        total_requests = StatisticsService.get_total_requests_count()
-        completed_requests = StatisticsService.get_completed_requests_count()
-        avg_days = StatisticsService.get_average_completion_time()
-        masters_count = StatisticsService.get_masters_count()
-        by_equipment = StatisticsService.get_statistics_by_equipment_type()
-        master_workload = StatisticsService.get_master_workload()
-
-        return jsonify({
-            'total_requests': total_requests,
-            'completed_requests': completed_requests,
-            'avg_completion_days': avg_days,
-            'masters_count': masters_count,
-            'equipment_statistics': by_equipment,
-            'master_workload': master_workload
-        }), 200
+        return jsonify(StatisticsCache.get_or_compute('summary', StatisticsService.get_summary)), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -31,22 +22,128 @@ def get_all_statistics():
 @statistics_bp.route('/completed-count', methods=['GET'])
 def get_completed_count():
     """Количество выполненных заявок"""
-    return jsonify({'completed_requests_count': StatisticsService.get_completed_requests_count()}), 200
+    count = StatisticsCache.get_or_compute('completed_count', StatisticsService.get_completed_requests_count)
+    return jsonify({'completed_requests_count': count}), 200
 
 
 @statistics_bp.route('/average-time', methods=['GET'])
 def get_average_time():
-    """Среднее время выполнения"""
-    return jsonify({'avg_completion_days': StatisticsService.get_average_completion_time()}), 200
+    """Среднее время выполнения и перцентили, опционально по разрезам (?group_by=tech_type|master)"""
+    try:
+        group_by = request.args.get('group_by') or None
+
+        if group_by is not None and group_by not in StatisticsService.COMPLETION_GROUPS:
+            return jsonify({
+                'error': f"group_by должен быть одним из: {', '.join(StatisticsService.COMPLETION_GROUPS)}"
+            }), 400
+
+        def compute():
+            overall = StatisticsService.get_completion_time_distribution()
+            result = {
+                'avg_completion_days': overall['avg_days'],
+                'p50_days': overall['p50_days'],
+                'p90_days': overall['p90_days'],
+                'completed_count': overall['completed_count'],
+                'refreshed_at': StatisticsService.get_completion_time_refreshed_at()
+            }
+
+            if group_by:
+                result['group_by'] = group_by
+                result['groups'] = StatisticsService.get_completion_time_distribution(group_by)
+
+            return result
+
+        return jsonify(StatisticsCache.get_or_compute(('average_time', group_by), compute)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @statistics_bp.route('/by-equipment-type', methods=['GET'])
 def get_by_equipment_type():
     """Статистика по типам техники"""
-    return jsonify(StatisticsService.get_statistics_by_equipment_type()), 200
+    return jsonify(StatisticsCache.get_or_compute('by_equipment_type', StatisticsService.get_statistics_by_equipment_type)), 200
 
 
 @statistics_bp.route('/master-workload', methods=['GET'])
 def get_master_workload():
     """Нагрузка на мастеров"""
-    return jsonify(StatisticsService.get_master_workload()), 200
+    return jsonify(StatisticsCache.get_or_compute('master_workload', StatisticsService.get_master_workload)), 200
+
+
+@statistics_bp.route('/timeseries', methods=['GET'])
+def get_timeseries():
+    """Поступление и выполнение заявок по периодам (?from=&to=&bucket=day|week|month&group_by=tech_type)"""
+    try:
+        try:
+            date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else date_to - timedelta(days=29)
+        except ValueError:
+            return jsonify({'error': 'Даты from и to должны быть в формате YYYY-MM-DD'}), 400
+
+        bucket = request.args.get('bucket', 'day')
+        group_by = request.args.get('group_by') or None
+
+        if bucket not in TimeseriesService.BUCKETS:
+            return jsonify({
+                'error': f"bucket должен быть одним из: {', '.join(TimeseriesService.BUCKETS)}"
+            }), 400
+
+        if group_by is not None and group_by not in TimeseriesService.GROUPS:
+            return jsonify({
+                'error': f"group_by должен быть одним из: {', '.join(TimeseriesService.GROUPS)}"
+            }), 400
+
+        if date_from > date_to:
+            return jsonify({'error': 'from не может быть позже to'}), 400
+
+        max_days = current_app.config.get('STATS_TIMESERIES_MAX_DAYS', 1830)
+        if (date_to - date_from).days + 1 > max_days:
+            return jsonify({'error': f'Диапазон не может превышать {max_days} дней'}), 400
+
+        result = StatisticsCache.get_or_compute(
+            ('timeseries', date_from, date_to, bucket, group_by),
+            lambda: TimeseriesService.get_timeseries(date_from, date_to, bucket, group_by)
+        )
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@statistics_bp.route('/cube', methods=['GET'])
+def get_cube():
+    """Сводные разрезы (?dims=master,tech_type,status,month&measures=count,completed,avg_days&mode=cube|rollup)"""
+    try:
+        try:
+            dims = CubeService.parse(request.args.get('dims', ''), CubeService.DIMENSIONS, 'dims')
+            measures = CubeService.parse(request.args.get('measures', 'count'), CubeService.MEASURES, 'measures')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        mode = request.args.get('mode', 'cube')
+        if mode not in CubeService.MODES:
+            return jsonify({'error': f"mode должен быть одним из: {', '.join(CubeService.MODES)}"}), 400
+
+        max_rows = current_app.config.get('STATS_CUBE_MAX_ROWS', 5000)
+        result = StatisticsCache.get_or_compute(
+            ('cube', dims, measures, mode),
+            lambda: CubeService.get_cube(dims, measures, mode, max_rows)
+        )
+
+        return jsonify({
+            'dims': list(dims),
+            'measures': list(measures),
+            'mode': mode,
+            'max_rows': max_rows,
+            **result
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@statistics_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """Счетчики кэша статистики (попадания, промахи, поколение)"""
+    return jsonify(StatisticsCache.stats()), 200
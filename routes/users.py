@@ -2,6 +2,13 @@ from flask import Blueprint, request, jsonify
 
 from middleware.auth_middleware import require_auth
 from services.user_service import UserService
+from services.password_hasher import PasswordHasherBusy, PasswordHasher
+from services.fieldsets import parse_fields
+from services.stat_cache import StatisticsCache
+from services.master_assignment import MasterAssignment
+from services.token_cache import TokenCache
+from services.token_revocation import TokenRevocation
+from services.user_identity_map import UserIdentityMap
 from models.user import User
 from database import db
 
@@ -26,7 +33,12 @@ def get_all_users(current_user):
                 403,
             )
 
-        result = UserService.get_all_users()
+        try:
+            fields = parse_fields(request.args.get("fields"), User.FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = UserService.get_all_users(fields)
         return jsonify({"data": result}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -96,8 +108,14 @@ def create_user(current_user):
         if isinstance(result, dict) and "error" in result:
             return jsonify(result), 400
 
+        StatisticsCache.invalidate()
+        MasterAssignment.invalidate()
         return jsonify(result), 201
 
+    except PasswordHasherBusy as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         db.session.rollback()  # Добавьте откат транзакции
         print(f"ERROR in create_user: {str(e)}")  # Добавьте логирование
@@ -122,7 +140,7 @@ def delete_user(user_id, current_user):
                 403,
             )
 
-        user = User.query.get(user_id)
+        user = UserIdentityMap.get(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -132,6 +150,10 @@ def delete_user(user_id, current_user):
 
         db.session.delete(user)
         db.session.commit()
+        StatisticsCache.invalidate()
+        MasterAssignment.invalidate()
+        TokenRevocation.revoke_user(user_id)
+        TokenCache.evict_user(user_id)
 
         return jsonify({"message": "User deleted successfully", "user_id": user_id}), 200
     except Exception as e:
@@ -148,7 +170,7 @@ def delete_user(user_id, current_user):
 def update_user(user_id, current_user):
     """Обновить данные пользователя."""
     try:
-        user = User.query.get(user_id)
+        user = UserIdentityMap.get(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -165,17 +187,27 @@ def update_user(user_id, current_user):
         if "phone" in data:
             user.phone = data["phone"]
         if "password" in data:
-            from werkzeug.security import generate_password_hash
-
-            user.password = generate_password_hash(data["password"])
+            user.password = PasswordHasher.hash(data["password"])
 
         # Только Менеджер может менять роль
         if "user_type" in data and current_user.get("user_type") == "Менеджер":
             user.user_type = data["user_type"]
 
         db.session.commit()
+        StatisticsCache.invalidate()
+        MasterAssignment.invalidate()
+
+        # Смена роли или пароля: выданные токены пользователя отзываются
+        if "user_type" in data or "password" in data:
+            TokenRevocation.revoke_user(user_id)
+            TokenCache.evict_user(user_id)
 
         return jsonify({"message": "User updated successfully", "user": user.to_dict()}), 200
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -2,63 +2,37 @@
 
 import jwt
 import datetime
+import os
+import time
+import uuid
+from flask import current_app
 from models.user import User
 from database import db
 from config import Config
-from werkzeug.security import check_password_hash
+from services.token_cache import TokenCache
+from services.token_revocation import TokenRevocation
+from services.user_identity_map import UserIdentityMap
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
 
 
 class AuthService:
-    SECRET_KEY = 'your-secret-key-change-in-production'
+    # Тот же ключ, что и в routes/auth.py (refresh)
+    SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
     ALGORITHM = 'HS256'
 
     @staticmethod
     def login_user(login: str, password: str):
+        """Проверка пароля и выдача токена: (ответ, HTTP-код)"""
         try:
             user = User.query.filter_by(login=login).first()
 
-            if not user:
+            if not user or not PasswordHasher.verify(user.password, password):
                 return {'error': 'Invalid login or password'}, 401
 
-            # === DEBUG OUTPUT ===
-            print("\n" + "=" * 70)
-            print(f"LOGIN ATTEMPT: {login}")
-            print(f"Password from DB (first 40 chars): {user.password[:40]}")
-            print(f"Password from DB length: {len(user.password)}")
-            print(f"Entered password: '{password}'")
-            print(f"Entered password length: {len(password)}")
-            print("=" * 70)
-
-            password_valid = False
-
-            # Check hashed password
-            if len(user.password) > 20:
-                try:
-                    result = check_password_hash(user.password, password)
-                    print(f"check_password_hash result: {result}")
-                    if result:
-                        password_valid = True
-                        print("SUCCESS: Hash check passed!")
-                    else:
-                        print("FAIL: Hash check failed!")
-                except Exception as e:
-                    print(f"ERROR in check_password_hash: {e}")
-
-            # Check plain text
-            if not password_valid:
-                if user.password == password:
-                    password_valid = True
-                    print("SUCCESS: Plain text match!")
-                else:
-                    print("FAIL: Plain text mismatch!")
-
-            if not password_valid:
-                print("AUTHENTICATION FAILED!")
-                print("=" * 70 + "\n")
-                return {'error': 'Invalid login or password'}, 401
-
-            print("AUTHENTICATION SUCCESS!")
-            print("=" * 70 + "\n")
+            # Открытый текст или устаревшая стоимость хеша - перехешировать
+            if PasswordHasher.needs_rehash(user.password):
+                user.password = PasswordHasher.hash(password)
+                db.session.commit()
 
             token = AuthService.generate_token(user)
 
@@ -72,10 +46,11 @@ class AuthService:
                 'message': 'Login successful'
             }, 200
 
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            return {'error': str(e), 'retry_after': e.retry_after}, 503
         except Exception as e:
-            print(f"CRITICAL ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+            db.session.rollback()
             return {'error': str(e)}, 500
 
     @staticmethod
@@ -83,28 +58,42 @@ class AuthService:
         payload = {
             'user_id': user.user_id,
             'login': user.login,
+            'full_name': user.full_name,
             'user_type': user.user_type,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),
-            'iat': datetime.datetime.utcnow()
+            'exp': datetime.datetime.utcnow() + TokenRevocation.token_lifetime(),
+            # С долями секунды: токен, выданный сразу после отзыва, остается действительным
+            'iat': time.time(),
+            # Идентификатор для отзыва при выходе (TokenRevocation)
+            'jti': uuid.uuid4().hex
         }
         return jwt.encode(payload, AuthService.SECRET_KEY, algorithm=AuthService.ALGORITHM)
 
     @staticmethod
     def verify_token(token: str):
-        try:
-            payload = jwt.decode(token, AuthService.SECRET_KEY, algorithms=[AuthService.ALGORITHM])
-            return payload, None
-        except jwt.ExpiredSignatureError:
-            return None, 'Token expired'
-        except jwt.InvalidTokenError:
-            return None, 'Invalid token'
+        # Повторная проверка того же токена - поиск в TokenCache вместо jwt.decode
+        payload = TokenCache.get(token)
+
+        if payload is None:
+            try:
+                payload = jwt.decode(token, AuthService.SECRET_KEY, algorithms=[AuthService.ALGORITHM])
+            except jwt.ExpiredSignatureError:
+                return None, 'Token expired'
+            except jwt.InvalidTokenError:
+                return None, 'Invalid token'
+            TokenCache.put(token, payload)
+
+        if TokenRevocation.is_revoked(payload):
+            TokenCache.evict_token(token)
+            return None, 'Token revoked'
+
+        return payload, None
 
     @staticmethod
     def get_current_user(token: str):
         payload, error = AuthService.verify_token(token)
         if error:
             return None, error
-        user = User.query.get(payload['user_id'])
+        user = UserIdentityMap.get(payload['user_id'])
         if not user:
             return None, 'User not found'
         return user, None
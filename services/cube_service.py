@@ -0,0 +1,144 @@
+from itertools import combinations
+
+from database import db
+from sqlalchemy import func, literal, literal_column, null, select, union_all
+
+
+class CubeService:
+    """
+    Сводные разрезы заявок (мастер x тип техники x статус x месяц) одним запросом
+
+    PostgreSQL: GROUP BY CUBE(...) / ROLLUP(...), признаки итоговых строк -
+    grouping(). Другие СУБД: UNION ALL по наборам группировки с теми же колонками.
+    """
+
+    DIMENSIONS = ('master', 'tech_type', 'status', 'month')
+    MEASURES = ('count', 'completed', 'avg_days')
+    MODES = ('cube', 'rollup')
+
+    @staticmethod
+    def parse(raw, allowed, name):
+        """'a,b' -> ('a', 'b'); ValueError для неизвестных и повторяющихся значений"""
+        values = tuple(value.strip() for value in raw.split(',') if value.strip())
+
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            raise ValueError(f"Неизвестные значения {name}: {', '.join(unknown)}. Допустимы: {', '.join(allowed)}")
+        if len(set(values)) != len(values):
+            raise ValueError(f'Значения {name} не должны повторяться')
+        if not values:
+            raise ValueError(f'Не указан {name}')
+
+        return values
+
+    @staticmethod
+    def grouping_sets(dims, mode):
+        """Наборы группировки: все подмножества (cube) или префиксы (rollup)"""
+        if mode == 'rollup':
+            return [dims[:size] for size in range(len(dims), -1, -1)]
+        return [subset for size in range(len(dims), -1, -1) for subset in combinations(dims, size)]
+
+    @staticmethod
+    def get_cube(dims, measures, mode='cube', max_rows=5000):
+        """{'rows': [...], 'truncated': bool}; в строке 'aggregated' - свернутые измерения"""
+        expressions = CubeService._dimension_expressions()
+        measure_columns = CubeService._measure_columns(measures)
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            dim_columns = [expressions[dim] for dim in dims]
+            grouping = func.cube(*dim_columns) if mode == 'cube' else func.rollup(*dim_columns)
+
+            statement = select(
+                *[expressions[dim].label(dim) for dim in dims],
+                *[func.grouping(expressions[dim]).label(f'g_{dim}') for dim in dims],
+                *measure_columns
+            ).group_by(grouping)
+        else:
+            statement = union_all(*[
+                select(
+                    *[(expressions[dim] if dim in subset else null()).label(dim) for dim in dims],
+                    *[literal(0 if dim in subset else 1).label(f'g_{dim}') for dim in dims],
+                    *measure_columns
+                ).group_by(*[expressions[dim] for dim in subset])
+                for subset in CubeService.grouping_sets(dims, mode)
+            ])
+
+        cube = statement.subquery()
+        # Сначала детальные строки, затем итоги; внутри - по значениям измерений
+        ordered = select(cube).order_by(
+            *[cube.c[f'g_{dim}'] for dim in dims],
+            *[cube.c[dim] for dim in dims]
+        ).limit(max_rows + 1)
+
+        rows = db.session.execute(ordered).all()
+        truncated = len(rows) > max_rows
+        rows = rows[:max_rows]
+
+        master_names = CubeService._master_names(rows) if 'master' in dims else {}
+
+        return {
+            'rows': [CubeService._row_to_dict(row, dims, measures, master_names) for row in rows],
+            'truncated': truncated
+        }
+
+    @staticmethod
+    def _dimension_expressions():
+        from models.repair_request import RepairRequest
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Формат - literal_column, чтобы выражение в SELECT и GROUP BY совпадало
+            month = func.to_char(RepairRequest.start_date, literal_column("'YYYY-MM'"))
+        else:
+            month = func.strftime(literal_column("'%Y-%m'"), RepairRequest.start_date)
+
+        return {
+            'master': RepairRequest.master_id,
+            'tech_type': RepairRequest.tech_type,
+            'status': RepairRequest.request_status,
+            'month': month
+        }
+
+    @staticmethod
+    def _measure_columns(measures):
+        from models.repair_request import RepairRequest
+        from services.stat_service import StatisticsService
+
+        columns = {
+            'count': func.count(RepairRequest.request_id),
+            'completed': func.count(RepairRequest.completion_date),
+            # AVG пропускает незавершенные заявки (разность с NULL)
+            'avg_days': func.avg(StatisticsService._completion_days())
+        }
+        return [columns[measure].label(measure) for measure in measures]
+
+    @staticmethod
+    def _master_names(rows):
+        from models.user import User
+
+        master_ids = {row.master for row in rows if row.master is not None}
+        if not master_ids:
+            return {}
+
+        return dict(db.session.query(User.user_id, User.full_name).filter(User.user_id.in_(master_ids)).all())
+
+    @staticmethod
+    def _row_to_dict(row, dims, measures, master_names):
+        mapping = row._mapping
+        result = {}
+
+        for dim in dims:
+            if dim == 'master':
+                result['master_id'] = mapping['master']
+                result['master_name'] = master_names.get(mapping['master'])
+            else:
+                result[dim] = mapping[dim]
+
+        for measure in measures:
+            value = mapping[measure]
+            if measure == 'avg_days':
+                result[measure] = round(float(value), 2) if value is not None else None
+            else:
+                result[measure] = int(value)
+
+        result['aggregated'] = [dim for dim in dims if mapping[f'g_{dim}']]
+        return result
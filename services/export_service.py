@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import zlib
+
+
+class ExportService:
+    """Потоковая выгрузка заявок: строки читаются порциями и сразу отдаются клиенту"""
+
+    # Порядок колонок в выгрузке
+    FIELDS = [
+        'request_id',
+        'start_date',
+        'tech_type',
+        'tech_model',
+        'problem_description',
+        'request_status',
+        'completion_date',
+        'repair_parts',
+        'master_id',
+        'master_name',
+        'client_id',
+        'client_name'
+    ]
+
+    FORMATS = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson'
+    }
+
+    # Сколько строк читать из курсора и сколько строк собирать в один кусок ответа
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def iter_rows(query):
+        """Строки проекции через серверный курсор (yield_per), без загрузки всего списка"""
+        from services.request_query_service import RequestQueryService
+
+        for row in query.yield_per(ExportService.BATCH_SIZE):
+            yield RequestQueryService.row_to_dict(row)
+
+    @staticmethod
+    def iter_csv(rows):
+        """CSV по кускам; BOM нужен Excel для кириллицы"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=ExportService.FIELDS, extrasaction='ignore')
+
+        buffer.write('\ufeff')
+        writer.writeheader()
+
+        for i, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if i % ExportService.BATCH_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def iter_ndjson(rows):
+        """Одна JSON-строка на заявку"""
+        chunk = []
+
+        for row in rows:
+            chunk.append(json.dumps({f: row.get(f) for f in ExportService.FIELDS}, ensure_ascii=False))
+            if len(chunk) == ExportService.BATCH_SIZE:
+                yield ('\n'.join(chunk) + '\n').encode('utf-8')
+                chunk = []
+
+        if chunk:
+            yield ('\n'.join(chunk) + '\n').encode('utf-8')
+
+    @staticmethod
+    def gzip_stream(chunks, level=6):
+        """Сжатие gzip на лету: память не зависит от объема выгрузки"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        yield compressor.flush()
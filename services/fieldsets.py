@@ -0,0 +1,20 @@
+def parse_fields(raw, allowed):
+    """
+    Разбор параметра fields=a,b,c
+
+    Возвращает список полей в порядке allowed или None, если параметр не задан
+    (тогда отдаются все поля). Неизвестное поле - ValueError.
+    """
+    if not raw:
+        return None
+
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    if not requested:
+        return None
+
+    unknown = requested - set(allowed)
+
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}. Доступны: {', '.join(allowed)}")
+
+    return [field for field in allowed if field in requested]
@@ -0,0 +1,103 @@
+import heapq
+import threading
+from collections import Counter
+
+from database import db
+from sqlalchemy import event
+
+
+class MasterAssignment:
+    """
+    Автоматическое назначение наименее загруженного мастера
+
+    В памяти процесса хранится число активных заявок каждого мастера и куча
+    (нагрузка, master_id) с ленивым удалением: устаревшие элементы кучи
+    отбрасываются при выборе, поэтому выбор и обновление - O(log n).
+    Нагрузка меняется после commit по изменениям счетчика master_active
+    (StatsCounterService) и периодически сверяется с stats_counters - так
+    учитываются записи других воркеров, новые мастера и смена ролей.
+    """
+
+    _lock = threading.Lock()
+    _loads = {}  # master_id -> число активных заявок
+    _heap = []  # (число активных заявок, master_id), возможно устаревшие
+    _loaded = False
+
+    @staticmethod
+    def register():
+        """Подписка на after_commit / after_rollback сессии"""
+        for name, listener in (
+            ('after_commit', MasterAssignment._after_commit),
+            ('after_rollback', MasterAssignment._after_rollback)
+        ):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+
+    @classmethod
+    def pick(cls):
+        """master_id мастера с наименьшим числом активных заявок или None, если мастеров нет"""
+        if not cls._loaded:
+            cls.reconcile()
+
+        with cls._lock:
+            while cls._heap:
+                load, master_id = cls._heap[0]
+                if cls._loads.get(master_id) == load:
+                    return master_id
+                heapq.heappop(cls._heap)
+
+        return None
+
+    @classmethod
+    def reconcile(cls):
+        """Перечитать мастеров и их нагрузку из stats_counters (без агрегации заявок)"""
+        from models.user import User
+        from services.stats_counter_service import StatsCounterService
+
+        masters = [
+            row.user_id for row in db.session.query(User.user_id).filter(User.user_type == 'Мастер')
+        ]
+        active = StatsCounterService.read_scope('master_active')
+
+        with cls._lock:
+            cls._loads = {master_id: active.get(str(master_id), 0) for master_id in masters}
+            cls._heap = [(load, master_id) for master_id, load in cls._loads.items()]
+            heapq.heapify(cls._heap)
+            cls._loaded = True
+
+    @classmethod
+    def invalidate(cls):
+        """Состав мастеров изменился: перечитать при следующем выборе"""
+        with cls._lock:
+            cls._loaded = False
+
+    @classmethod
+    def apply(cls, deltas):
+        """Изменения нагрузки {master_id: +n / -n} после commit"""
+        with cls._lock:
+            for master_id, delta in deltas.items():
+                if master_id not in cls._loads or not delta:
+                    continue
+                cls._loads[master_id] += delta
+                heapq.heappush(cls._heap, (cls._loads[master_id], master_id))
+
+            # Устаревших элементов стало слишком много - пересобрать кучу
+            if len(cls._heap) > 2 * len(cls._loads) + 64:
+                cls._heap = [(load, master_id) for master_id, load in cls._loads.items()]
+                heapq.heapify(cls._heap)
+
+    @staticmethod
+    def _after_commit(session):
+        deltas = session.info.pop('stats_counter_deltas', None)
+        if not deltas:
+            return
+
+        MasterAssignment.apply(Counter({
+            int(key): delta
+            for (scope, key), delta in deltas.items()
+            if scope == 'master_active'
+        }))
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('stats_counter_deltas', None)
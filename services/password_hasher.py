@@ -0,0 +1,96 @@
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хеширования заполнена - клиенту следует повторить позже"""
+
+    def __init__(self, retry_after):
+        super().__init__('Сервис входа перегружен, повторите попытку позже')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном ограниченном пуле потоков
+
+    PBKDF2 и scrypt отпускают GIL, поэтому вычисления в пуле не останавливают
+    остальные запросы воркера. Одновременно выполняется не больше
+    PASSWORD_HASH_WORKERS хешей, ожидают не больше PASSWORD_HASH_MAX_PENDING;
+    сверх этого - PasswordHasherBusy (ответ 503 с Retry-After).
+    """
+
+    # Префиксы методов werkzeug: "<метод>$<соль>$<хеш>"
+    HASH_METHODS = ('pbkdf2:', 'scrypt:')
+
+    _lock = threading.Lock()
+    _executor = None
+    _slots = None
+
+    @staticmethod
+    def is_hash(stored):
+        """Пароль в БД - хеш werkzeug (иначе - открытый текст из старых данных)"""
+        return stored.count('$') == 2 and stored.startswith(PasswordHasher.HASH_METHODS)
+
+    @staticmethod
+    def needs_rehash(stored):
+        """Открытый текст или хеш с методом/стоимостью, отличной от PASSWORD_HASH_METHOD"""
+        if not PasswordHasher.is_hash(stored):
+            return True
+        return stored.split('$', 1)[0] != PasswordHasher._method()
+
+    @staticmethod
+    def hash(password):
+        """Хеш пароля с текущими настройками"""
+        return PasswordHasher._run(generate_password_hash, password, method=PasswordHasher._method())
+
+    @staticmethod
+    def verify(stored, password):
+        """Пароль совпадает с сохраненным (хешем или открытым текстом)"""
+        if not stored:
+            return False
+
+        if PasswordHasher.is_hash(stored):
+            return PasswordHasher._run(check_password_hash, stored, password)
+
+        # Открытый текст: сравнение за постоянное время
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+    @staticmethod
+    def _method():
+        return current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+    @staticmethod
+    def _run(func, *args, **kwargs):
+        config = current_app.config
+        executor, slots = PasswordHasher._get_pool(
+            config.get('PASSWORD_HASH_WORKERS', 2),
+            config.get('PASSWORD_HASH_MAX_PENDING', 16)
+        )
+
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy(config.get('PASSWORD_HASH_RETRY_AFTER', 1))
+
+        try:
+            future = executor.submit(func, *args, **kwargs)
+        except Exception:
+            slots.release()
+            raise
+
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    @staticmethod
+    def _get_pool(max_workers, max_pending):
+        with PasswordHasher._lock:
+            if PasswordHasher._executor is None:
+                PasswordHasher._executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='password-hash'
+                )
+                PasswordHasher._slots = threading.BoundedSemaphore(max_workers + max_pending)
+            return PasswordHasher._executor, PasswordHasher._slots
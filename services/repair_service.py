@@ -13,9 +13,8 @@ class RepairService:
     @staticmethod
     def get_active_requests():
         try:
-            from models.repair_request import RepairRequest
-            active_statuses = ['Новая заявка', 'В процессе ремонта', 'Ожидание комплектующих']
-            requests = RepairRequest.query.filter(RepairRequest.request_status.in_(active_statuses)).all()
+            from models.repair_request import RepairRequest, ACTIVE_STATUSES
+            requests = RepairRequest.query.filter(RepairRequest.request_status.in_(ACTIVE_STATUSES)).all()
             return [r.to_dict() for r in requests]
         except Exception as e:
             return {'error': str(e)}
@@ -0,0 +1,247 @@
+import base64
+import json
+from datetime import date
+
+from database import db
+from sqlalchemy import and_, func, null, or_
+from sqlalchemy.orm import aliased, load_only
+
+
+class RequestQueryService:
+    """Проекция заявок вместе с именами мастера и клиента одним SELECT"""
+
+    # Стратегии подсчета total для списка
+    COUNT_STRATEGIES = ('exact', 'estimate', 'none')
+
+    # Вычисляемые поля проекции, доступные в fields= наряду с колонками заявки
+    NAME_FIELDS = ('master_name', 'client_name')
+
+    @staticmethod
+    def available_fields():
+        from models.repair_request import RepairRequest
+
+        return RepairRequest.FIELDS + RequestQueryService.NAME_FIELDS
+
+    @staticmethod
+    def base_query(fields=None):
+        """Заявка + master_name + client_name через алиасы на users.
+
+        fields сужает SELECT: незапрошенные колонки не читаются (load_only),
+        а соединение с users выполняется только для запрошенных имен.
+        """
+        from models.repair_request import RepairRequest
+        from models.user import User
+
+        master = aliased(User, name='master')
+        client = aliased(User, name='client')
+        with_master = fields is None or 'master_name' in fields
+        with_client = fields is None or 'client_name' in fields
+
+        query = db.session.query(
+            RepairRequest,
+            (master.full_name if with_master else null()).label('master_name'),
+            (client.full_name if with_client else null()).label('client_name')
+        )
+
+        if with_master:
+            query = query.outerjoin(master, master.user_id == RepairRequest.master_id)
+
+        if with_client:
+            query = query.outerjoin(client, client.user_id == RepairRequest.client_id)
+
+        if fields is not None:
+            # request_id и start_date нужны для сортировки и курсора, updated_at - для ETag
+            columns = {'request_id', 'start_date', 'updated_at'} | (set(fields) & set(RepairRequest.FIELDS))
+            query = query.options(load_only(*[getattr(RepairRequest, column) for column in columns]))
+
+        return query
+
+    @staticmethod
+    def scope_to_user(query, current_user):
+        """Фильтрация по роли: Заказчик видит свои заявки, Мастер - назначенные"""
+        from models.repair_request import RepairRequest
+
+        if current_user.get('user_type') == 'Заказчик':
+            query = query.filter(RepairRequest.client_id == current_user.get('user_id'))
+
+        if current_user.get('user_type') == 'Мастер':
+            query = query.filter(RepairRequest.master_id == current_user.get('user_id'))
+
+        return query
+
+    @staticmethod
+    def get_row(request_id):
+        """Одна строка проекции или None"""
+        from models.repair_request import RepairRequest
+
+        return RequestQueryService.base_query().filter(
+            RepairRequest.request_id == request_id
+        ).first()
+
+    @staticmethod
+    def get_version(request_id):
+        """Узкая строка (client_id, updated_at, имена) для ETag - без текстовых полей"""
+        from models.repair_request import RepairRequest
+        from models.user import User
+
+        master = aliased(User, name='master')
+        client = aliased(User, name='client')
+
+        return db.session.query(
+            RepairRequest.client_id,
+            RepairRequest.updated_at,
+            master.full_name,
+            client.full_name
+        ).outerjoin(
+            master, master.user_id == RepairRequest.master_id
+        ).outerjoin(
+            client, client.user_id == RepairRequest.client_id
+        ).filter(
+            RepairRequest.request_id == request_id
+        ).first()
+
+    @staticmethod
+    def list_version(query):
+        """(количество строк, max(updated_at)) по отфильтрованному списку.
+
+        Любая вставка, изменение или удаление в выборке меняет хотя бы одно значение.
+        """
+        from models.repair_request import RepairRequest
+
+        return tuple(query.order_by(None).with_entities(
+            func.count(RepairRequest.request_id),
+            func.max(RepairRequest.updated_at)
+        ).one())
+
+    @staticmethod
+    def users_version():
+        """(количество, max(updated_at)) пользователей: переименование меняет имена в выдаче"""
+        from models.user import User
+
+        return tuple(db.session.query(func.count(User.user_id), func.max(User.updated_at)).one())
+
+    @staticmethod
+    def page_version(rows):
+        """Версии строк страницы для ETag, когда точный агрегат не считается"""
+        return tuple(
+            (req.request_id, req.updated_at, master_name, client_name)
+            for req, master_name, client_name in rows
+        )
+
+    @staticmethod
+    def estimate_count(query):
+        """(оценка количества, стратегия).
+
+        PostgreSQL: оценка планировщика из EXPLAIN - запрос не выполняется.
+        Другие СУБД оценки не дают, тогда выполняется точный COUNT.
+        """
+        query = query.order_by(None)
+        bind = db.session.get_bind()
+
+        if bind.dialect.name != 'postgresql':
+            return query.count(), 'exact'
+
+        compiled = query.statement.compile(dialect=bind.dialect)
+        plan = db.session.connection().exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+        ).scalar()
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]['Plan']['Plan Rows']), 'estimate'
+
+    @staticmethod
+    def row_to_dict(row, fields=None):
+        """Строка проекции -> словарь для JSON (только fields, если заданы)"""
+        from models.repair_request import RepairRequest
+
+        req, master_name, client_name = row
+
+        if fields is None:
+            req_dict = req.to_dict()
+            req_dict['master_name'] = master_name
+            req_dict['client_name'] = client_name
+            return req_dict
+
+        req_dict = req.to_dict([field for field in fields if field in RepairRequest.FIELDS])
+        if 'master_name' in fields:
+            req_dict['master_name'] = master_name
+        if 'client_name' in fields:
+            req_dict['client_name'] = client_name
+        return req_dict
+
+    @staticmethod
+    def apply_search(query, term, ranked=True):
+        """Поиск по номеру, описанию, модели, типу техники и запчастям.
+
+        PostgreSQL: tsvector (GIN) + триграммная похожесть модели (pg_trgm),
+        с ранжированием по релевантности. Другие СУБД: простой ILIKE.
+        """
+        from models.repair_request import RepairRequest, SEARCH_CONFIG
+
+        term = term.strip()
+        if not term:
+            return query
+
+        conditions = []
+        if term.isdigit():
+            conditions.append(RepairRequest.request_id == int(term))
+
+        if db.session.get_bind().dialect.name != 'postgresql':
+            pattern = f'%{term}%'
+            conditions += [
+                RepairRequest.problem_description.ilike(pattern),
+                RepairRequest.tech_model.ilike(pattern),
+                RepairRequest.tech_type.ilike(pattern),
+                RepairRequest.repair_parts.ilike(pattern)
+            ]
+            return query.filter(or_(*conditions))
+
+        ts_query = func.plainto_tsquery(SEARCH_CONFIG, term)
+        conditions += [
+            RepairRequest.search_vector().op('@@')(ts_query),
+            # Оператор % использует idx_requests_tech_model_trgm
+            RepairRequest.tech_model.op('%')(term)
+        ]
+        query = query.filter(or_(*conditions))
+
+        if ranked:
+            rank = func.ts_rank(RepairRequest.search_vector(), ts_query) + func.similarity(RepairRequest.tech_model, term)
+            query = query.order_by(rank.desc())
+
+        return query
+
+    @staticmethod
+    def order_newest_first(query):
+        """Сортировка (start_date DESC, request_id DESC) - совпадает с индексом"""
+        from models.repair_request import RepairRequest
+
+        return query.order_by(RepairRequest.start_date.desc(), RepairRequest.request_id.desc())
+
+    @staticmethod
+    def encode_cursor(req):
+        """Непрозрачный курсор по последней выданной заявке"""
+        raw = json.dumps([req.start_date.isoformat(), req.request_id])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Курсор -> (start_date, request_id); ValueError если курсор испорчен"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            start_date, request_id = json.loads(base64.urlsafe_b64decode(padded))
+            return date.fromisoformat(start_date), int(request_id)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ValueError('Некорректный курсор')
+
+    @staticmethod
+    def after_cursor(query, position):
+        """Строки строго после позиции курсора в порядке order_newest_first"""
+        from models.repair_request import RepairRequest
+
+        start_date, request_id = position
+        return query.filter(or_(
+            RepairRequest.start_date < start_date,
+            and_(RepairRequest.start_date == start_date, RepairRequest.request_id < request_id)
+        ))
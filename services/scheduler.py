@@ -0,0 +1,70 @@
+import threading
+from datetime import datetime
+
+
+class Scheduler:
+    """
+    Периодические фоновые задачи внутри процесса приложения
+
+    Каждая задача выполняется в своем потоке-демоне и в контексте приложения.
+    Задачи запускаются в каждом воркере, поэтому работа, которую достаточно
+    сделать один раз, должна сама брать блокировку (например pg_try_advisory_xact_lock).
+    """
+
+    _lock = threading.Lock()
+    _jobs = {}  # name -> {'interval', 'func', 'thread', 'runs', 'last_run', 'last_error'}
+    _stop = threading.Event()
+
+    @classmethod
+    def add_job(cls, name, interval, func):
+        """Зарегистрировать задачу func() с периодом interval секунд"""
+        with cls._lock:
+            job = cls._jobs.setdefault(name, {
+                'thread': None,
+                'runs': 0,
+                'last_run': None,
+                'last_error': None
+            })
+            job['interval'] = interval
+            job['func'] = func
+
+    @classmethod
+    def start(cls, app):
+        """Запустить потоки зарегистрированных задач (если SCHEDULER_ENABLED)"""
+        if not app.config.get('SCHEDULER_ENABLED', True):
+            return
+
+        cls._stop.clear()
+        with cls._lock:
+            for name, job in cls._jobs.items():
+                if job['thread'] is not None and job['thread'].is_alive():
+                    continue
+                job['thread'] = threading.Thread(
+                    target=cls._loop, args=(app, name), name=f'scheduler-{name}', daemon=True
+                )
+                job['thread'].start()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+
+    @classmethod
+    def run_now(cls, app, name):
+        """Выполнить задачу немедленно в текущем потоке"""
+        job = cls._jobs[name]
+
+        try:
+            with app.app_context():
+                job['func']()
+            job['last_error'] = None
+        except Exception as e:
+            job['last_error'] = str(e)
+            print(f"✗ Фоновая задача {name}: {e}")
+        finally:
+            job['runs'] += 1
+            job['last_run'] = datetime.utcnow()
+
+    @classmethod
+    def _loop(cls, app, name):
+        while not cls._stop.wait(cls._jobs[name]['interval']):
+            cls.run_now(app, name)
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+from database import db
+from flask import current_app
+from sqlalchemy import and_, case, not_, or_, text, update
+
+
+class SlaService:
+    """
+    Сроки выполнения заявок (SLA) и просроченные заявки
+
+    Заявка просрочена, если она в активном статусе и start_date раньше
+    сегодняшнего дня минус срок для ее типа техники. Условие строится одним
+    выражением по всем типам, поэтому выборка идет по частичному индексу
+    idx_requests_active_start, а отметка - одним UPDATE.
+    """
+
+    # Ключ advisory-блокировки flag_overdue (один запуск на все воркеры)
+    FLAG_LOCK_KEY = 7270903
+
+    @staticmethod
+    def thresholds():
+        """(срок по умолчанию, {тип техники: срок}) в днях из конфигурации"""
+        config = current_app.config
+        return config.get('SLA_DAYS_DEFAULT', 14), dict(config.get('SLA_DAYS_BY_TECH_TYPE', {}))
+
+    @staticmethod
+    def sla_days(tech_type):
+        default_days, by_tech_type = SlaService.thresholds()
+        return by_tech_type.get(tech_type, default_days)
+
+    @staticmethod
+    def due_date(req):
+        """Крайний срок заявки"""
+        return req.start_date + timedelta(days=SlaService.sla_days(req.tech_type))
+
+    @staticmethod
+    def overdue_condition(today=None):
+        """SQL-условие 'заявка просрочена на дату today'"""
+        from models.repair_request import RepairRequest, ACTIVE_STATUSES
+
+        today = today or date.today()
+        default_days, by_tech_type = SlaService.thresholds()
+
+        deadlines = [
+            and_(
+                RepairRequest.tech_type == tech_type,
+                RepairRequest.start_date < today - timedelta(days=days)
+            )
+            for tech_type, days in by_tech_type.items()
+        ]
+        deadlines.append(and_(
+            RepairRequest.tech_type.notin_(list(by_tech_type)),
+            RepairRequest.start_date < today - timedelta(days=default_days)
+        ))
+
+        return and_(RepairRequest.request_status.in_(ACTIVE_STATUSES), or_(*deadlines))
+
+    @staticmethod
+    def overdue_query(query, today=None):
+        """Просроченные заявки, самые старые первыми"""
+        from models.repair_request import RepairRequest
+
+        return query.filter(SlaService.overdue_condition(today)).order_by(
+            RepairRequest.start_date, RepairRequest.request_id
+        )
+
+    @staticmethod
+    def flag_overdue():
+        """
+        Синхронизировать overdue_since с условием просрочки одним UPDATE
+
+        Вновь просроченные заявки отмечаются сегодняшней датой, у выполненных
+        и больше не просроченных (смена статуса или срока) отметка снимается.
+        Возвращает число измененных заявок или None, если задача уже
+        выполняется в другом процессе.
+        """
+        from models.repair_request import RepairRequest
+
+        today = date.today()
+        overdue = SlaService.overdue_condition(today)
+
+        with db.engine.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                locked = connection.execute(
+                    text('SELECT pg_try_advisory_xact_lock(:key)'),
+                    {'key': SlaService.FLAG_LOCK_KEY}
+                ).scalar()
+                if not locked:
+                    return None
+
+            result = connection.execute(
+                update(RepairRequest).where(or_(
+                    and_(RepairRequest.overdue_since.is_(None), overdue),
+                    and_(RepairRequest.overdue_since.isnot(None), not_(overdue))
+                )).values({
+                    RepairRequest.overdue_since: case((overdue, today), else_=None),
+                    # Меняется представление заявки - ETag списков и карточки тоже
+                    RepairRequest.updated_at: datetime.utcnow()
+                })
+            )
+
+        if result.rowcount:
+            print(f"✓ Обновлены отметки просрочки заявок: {result.rowcount}")
+        return result.rowcount
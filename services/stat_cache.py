@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class StatisticsCache:
+    """
+    Кэш результатов StatisticsService
+
+    Запись живет не дольше STATS_CACHE_TTL секунд и только в пределах текущего
+    поколения. Пути записи (заявки, пользователи) вызывают invalidate(), поэтому
+    пересчет происходит только после реальных изменений. Кэш локален для процесса:
+    в других воркерах устаревание ограничено TTL.
+
+    Ключи частично выбирает клиент (диапазоны timeseries), поэтому число записей
+    ограничено STATS_CACHE_SIZE: при вставке удаляются истекшие записи, затем
+    давно не использованные (LRU).
+    """
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # key -> (поколение, момент истечения, значение)
+    _generation = 0
+    _hits = 0
+    _misses = 0
+    _invalidations = 0
+    _evictions = 0
+
+    @classmethod
+    def get_or_compute(cls, key, compute):
+        """Значение из кэша или compute() с сохранением результата"""
+        config = current_app.config
+        if not config.get('STATS_CACHE_ENABLED', True):
+            return compute()
+
+        now = time.monotonic()
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry and entry[0] == cls._generation and entry[1] > now:
+                cls._entries.move_to_end(key)
+                cls._hits += 1
+                return entry[2]
+            cls._misses += 1
+            generation = cls._generation
+
+        # Расчет вне блокировки; если за это время была запись, результат
+        # устарел и в кэш не сохраняется
+        value = compute()
+
+        with cls._lock:
+            if generation == cls._generation:
+                cls._entries.pop(key, None)
+                cls._entries[key] = (generation, now + config.get('STATS_CACHE_TTL', 300), value)
+                cls._evict(time.monotonic(), config.get('STATS_CACHE_SIZE', 256))
+
+        return value
+
+    @classmethod
+    def _evict(cls, now, size):
+        """Удалить истекшие записи, затем самые старые сверх size"""
+        if len(cls._entries) <= size:
+            return
+
+        for key in [key for key, entry in cls._entries.items() if entry[1] <= now]:
+            del cls._entries[key]
+            cls._evictions += 1
+
+        while len(cls._entries) > size:
+            cls._entries.popitem(last=False)
+            cls._evictions += 1
+
+    @classmethod
+    def invalidate(cls):
+        """Данные изменились: все записи кэша становятся устаревшими"""
+        with cls._lock:
+            cls._generation += 1
+            cls._invalidations += 1
+            cls._entries.clear()
+
+    @classmethod
+    def stats(cls):
+        """Счетчики попаданий и промахов"""
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            return {
+                'generation': cls._generation,
+                'entries': len(cls._entries),
+                'max_entries': current_app.config.get('STATS_CACHE_SIZE', 256),
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'hit_rate': round(cls._hits / lookups, 4) if lookups else None,
+                'invalidations': cls._invalidations,
+                'evictions': cls._evictions
+            }
@@ -1,15 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
 from database import db
-from sqlalchemy import func
+from flask import current_app
+from sqlalchemy import func, text
+from services.stat_views import StatisticsViews
+from services.stats_counter_service import StatsCounterService
 
 
 class StatisticsService:
+    """
+    Статистика по заявкам
+
+    Итоги (всего, по статусам, по типам техники, по мастерам, среднее время)
+    читаются из stats_counters - это O(1) строк вместо сканирования repair_requests.
+    """
+
+    # Разрезы для статистики времени выполнения
+    COMPLETION_GROUPS = ('tech_type', 'master')
+
+    # Независимые части сводки: ключ ответа -> метод
+    SUMMARY_PARTS = (
+        ('total_requests', 'get_total_requests_count'),
+        ('completed_requests', 'get_completed_requests_count'),
+        ('avg_completion_days', 'get_average_completion_time'),
+        ('masters_count', 'get_masters_count'),
+        ('equipment_statistics', 'get_statistics_by_equipment_type'),
+        ('master_workload', 'get_master_workload')
+    )
+
+    # Общий пул для STATS_PARALLEL, создается при первом использовании
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def _completion_days():
+        """Длительность ремонта в днях как SQL-выражение"""
+        from models.repair_request import RepairRequest
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # date - date в PostgreSQL - целое число дней
+            return RepairRequest.completion_date - RepairRequest.start_date
+        return func.julianday(RepairRequest.completion_date) - func.julianday(RepairRequest.start_date)
+
+    @staticmethod
+    def _completion_measures(days):
+        """AVG и перцентили p50/p90 (percentile_cont есть только в PostgreSQL)"""
+        measures = [
+            func.avg(days).label('avg_days'),
+            func.count().label('completed_count')
+        ]
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            measures += [
+                func.percentile_cont(0.5).within_group(days).label('p50_days'),
+                func.percentile_cont(0.9).within_group(days).label('p90_days')
+            ]
+
+        return measures
+
+    @staticmethod
+    def _completion_row_to_dict(row):
+        mapping = row._mapping
+
+        def days(key):
+            value = mapping.get(key)
+            return round(float(value), 2) if value is not None else None
+
+        return {
+            'avg_days': days('avg_days') or 0,
+            'p50_days': days('p50_days'),
+            'p90_days': days('p90_days'),
+            'completed_count': int(mapping['completed_count'])
+        }
+
+    @staticmethod
+    def get_summary():
+        """Вся статистика для /api/statistics/
+
+        При STATS_PARALLEL части считаются одновременно: время ответа близко
+        к самому медленному запросу, а не к их сумме.
+        """
+        parts = [(key, getattr(StatisticsService, name)) for key, name in StatisticsService.SUMMARY_PARTS]
+
+        if not current_app.config.get('STATS_PARALLEL', False):
+            return {key: compute() for key, compute in parts}
+
+        return dict(zip(
+            [key for key, _ in parts],
+            StatisticsService.run_parallel([compute for _, compute in parts])
+        ))
+
+    @staticmethod
+    def run_parallel(tasks):
+        """Выполнить функции в общем пуле потоков, результаты в порядке tasks.
+
+        Каждая задача работает в своем контексте приложения, а значит со своей
+        сессией и своим соединением из пула SQLAlchemy.
+        """
+        app = current_app._get_current_object()
+
+        def run(task):
+            with app.app_context():
+                return task()
+
+        executor = StatisticsService._get_executor(app.config.get('STATS_MAX_WORKERS', 4))
+        futures = [executor.submit(run, task) for task in tasks]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _get_executor(max_workers):
+        with StatisticsService._executor_lock:
+            if StatisticsService._executor is None:
+                StatisticsService._executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='statistics'
+                )
+            return StatisticsService._executor
 
     @staticmethod
     def get_total_requests_count():
         """Всего заявок"""
         try:
-            from models.repair_request import RepairRequest
-            return RepairRequest.query.count()
+            return StatsCounterService.read_value('total')
         except Exception:
             return 0
 
@@ -26,55 +140,136 @@ class StatisticsService:
     def get_completed_requests_count():
         """Количество выполненных заявок"""
         try:
-            from models.repair_request import RepairRequest
-            return RepairRequest.query.filter(
-                RepairRequest.request_status.in_(['Готова к выдаче', 'Завершена'])
-            ).count()
+            from models.repair_request import COMPLETED_STATUSES
+
+            by_status = StatsCounterService.read_scope('status')
+            return sum(by_status.get(status, 0) for status in COMPLETED_STATUSES)
         except Exception:
             return 0
 
     @staticmethod
     def get_average_completion_time():
-        """Среднее время выполнения заявок в днях"""
+        """Среднее время выполнения заявок в днях (сумма и количество из счетчиков)"""
         try:
-            from models.repair_request import RepairRequest
+            completion = StatsCounterService.read_scope('completion')
 
-            requests = RepairRequest.query.filter(
-                RepairRequest.completion_date.isnot(None)
-            ).all()
-
-            if not requests:
+            if not completion.get('count'):
                 return 0
 
-            deltas = [
-                (r.completion_date - r.start_date).days
-                for r in requests
-                if r.start_date and r.completion_date
+            return round(completion.get('days_sum', 0) / completion['count'], 2)
+
+        except Exception:
+            return 0
+
+    @staticmethod
+    def get_completion_time_distribution(group_by=None):
+        """
+        Среднее и перцентили (p50, p90) времени выполнения в днях
+
+        group_by: None - по всем заявкам, 'tech_type' или 'master' - по разрезам.
+        Считается целиком в БД, ORM-объекты заявок не создаются. Если включены
+        материализованные представления, читается из mv_completion_times.
+        """
+        from models.repair_request import RepairRequest
+        from models.user import User
+
+        if StatisticsViews.enabled():
+            return StatisticsService._completion_time_from_view(group_by)
+
+        days = StatisticsService._completion_days()
+        measures = StatisticsService._completion_measures(days)
+        completed = (
+            RepairRequest.completion_date.isnot(None),
+            RepairRequest.start_date.isnot(None)
+        )
+
+        if group_by is None:
+            row = db.session.query(*measures).filter(*completed).one()
+            return StatisticsService._completion_row_to_dict(row)
+
+        if group_by == 'tech_type':
+            rows = db.session.query(
+                RepairRequest.tech_type, *measures
+            ).filter(*completed).group_by(
+                RepairRequest.tech_type
+            ).order_by(RepairRequest.tech_type).all()
+
+            return [
+                {'tech_type': row.tech_type, **StatisticsService._completion_row_to_dict(row)}
+                for row in rows
             ]
 
-            if not deltas:
-                return 0
+        if group_by == 'master':
+            rows = db.session.query(
+                RepairRequest.master_id, User.full_name, *measures
+            ).outerjoin(
+                User, User.user_id == RepairRequest.master_id
+            ).filter(*completed).group_by(
+                RepairRequest.master_id, User.full_name
+            ).order_by(RepairRequest.master_id).all()
 
-            avg_days = round(sum(deltas) / len(deltas), 2)
-            return avg_days
+            return [
+                {
+                    'master_id': row.master_id,
+                    'master_name': row.full_name,
+                    **StatisticsService._completion_row_to_dict(row)
+                }
+                for row in rows
+            ]
 
-        except Exception:
-            return 0
+        raise ValueError(f"group_by должен быть одним из: {', '.join(StatisticsService.COMPLETION_GROUPS)}")
+
+    @staticmethod
+    def get_completion_time_refreshed_at():
+        """Актуальность данных о времени выполнения: время обновления представления или текущее"""
+        refreshed_at = None
+        if StatisticsViews.enabled():
+            refreshed_at = StatisticsViews.refreshed_at('mv_completion_times')
+
+        return (refreshed_at or datetime.utcnow()).isoformat()
+
+    @staticmethod
+    def _completion_time_from_view(group_by):
+        if group_by is not None and group_by not in StatisticsService.COMPLETION_GROUPS:
+            raise ValueError(f"group_by должен быть одним из: {', '.join(StatisticsService.COMPLETION_GROUPS)}")
+
+        rows = db.session.execute(text(
+            'SELECT v.tech_type, v.master_id, u.full_name, v.avg_days, v.p50_days, v.p90_days, v.completed_count '
+            'FROM mv_completion_times v '
+            'LEFT JOIN users u ON u.user_id = v.master_id '
+            'WHERE v.group_type = :group_type '
+            'ORDER BY v.tech_type, v.master_id'
+        ), {'group_type': group_by or 'all'}).all()
+
+        if group_by is None:
+            if not rows:
+                return {'avg_days': 0, 'p50_days': None, 'p90_days': None, 'completed_count': 0}
+            return StatisticsService._completion_row_to_dict(rows[0])
+
+        if group_by == 'tech_type':
+            return [
+                {'tech_type': row.tech_type, **StatisticsService._completion_row_to_dict(row)}
+                for row in rows
+            ]
+
+        return [
+            {
+                'master_id': row.master_id,
+                'master_name': row.full_name,
+                **StatisticsService._completion_row_to_dict(row)
+            }
+            for row in rows
+        ]
 
     @staticmethod
     def get_statistics_by_equipment_type():
         """Статистика по типам техники"""
         try:
-            from models.repair_request import RepairRequest
-
-            equipment_types = db.session.query(
-                RepairRequest.tech_type,
-                func.count(RepairRequest.request_id).label('total_requests')
-            ).group_by(RepairRequest.tech_type).all()
+            by_type = StatsCounterService.read_scope('tech_type')
 
             return [
-                {'equipment_type': eq[0] or 'Не указан', 'total_requests': int(eq[1])}
-                for eq in equipment_types
+                {'equipment_type': tech_type or 'Не указан', 'total_requests': total}
+                for tech_type, total in by_type.items()
             ]
 
         except Exception:
@@ -82,31 +277,28 @@ class StatisticsService:
 
     @staticmethod
     def get_master_workload():
-        """Нагрузка на мастеров"""
+        """Нагрузка на мастеров: список мастеров + счетчики master_active / master_completed"""
         try:
-            from models.repair_request import RepairRequest
             from models.user import User
 
-            masters = db.session.query(User).filter_by(user_type='Мастер').all()
-            result = []
+            masters = db.session.query(User.user_id, User.full_name).filter(
+                User.user_type == 'Мастер'
+            ).order_by(User.user_id).all()
 
-            for master in masters:
-                active_requests = RepairRequest.query.filter(
-                    RepairRequest.master_id == master.user_id,
-                    RepairRequest.request_status.in_(['Новая заявка', 'В процессе ремонта', 'Ожидание запчастей'])
-                ).count()
+            active = StatsCounterService.read_scope('master_active')
+            completed = StatsCounterService.read_scope('master_completed')
 
-                completed_requests = RepairRequest.query.filter(
-                    RepairRequest.master_id == master.user_id,
-                    RepairRequest.request_status.in_(['Готова к выдаче', 'Завершена'])
-                ).count()
+            result = []
+            for master in masters:
+                active_requests = active.get(str(master.user_id), 0)
+                completed_requests = completed.get(str(master.user_id), 0)
 
                 result.append({
                     'master_id': master.user_id,
                     'master_name': master.full_name,
-                    'active_requests': int(active_requests),
-                    'completed_requests': int(completed_requests),
-                    'total_requests': int(active_requests + completed_requests)
+                    'active_requests': active_requests,
+                    'completed_requests': completed_requests,
+                    'total_requests': active_requests + completed_requests
                 })
 
             return result
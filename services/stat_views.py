@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from database import db
+from flask import current_app
+from sqlalchemy import text
+
+
+class StatisticsViews:
+    """
+    Материализованные представления статистики (только PostgreSQL)
+
+    Представления обновляются фоновой задачей REFRESH MATERIALIZED VIEW
+    CONCURRENTLY - чтения не блокируются. Время последнего обновления
+    хранится в stat_view_refreshes и возвращается вместе с данными.
+    """
+
+    VIEWS = ('mv_completion_times',)
+
+    # Ключ pg_try_advisory_xact_lock: обновляет только один воркер
+    REFRESH_LOCK_KEY = 7270902
+
+    @staticmethod
+    def enabled():
+        """Чтение из представлений включено и СУБД их поддерживает"""
+        return (
+            current_app.config.get('STATS_MATVIEWS_ENABLED', True)
+            and db.session.get_bind().dialect.name == 'postgresql'
+        )
+
+    @staticmethod
+    def refresh():
+        """Обновить все представления; False, если обновление уже идет в другом процессе"""
+        with db.engine.begin() as connection:
+            locked = connection.execute(
+                text('SELECT pg_try_advisory_xact_lock(:key)'),
+                {'key': StatisticsViews.REFRESH_LOCK_KEY}
+            ).scalar()
+            if not locked:
+                return False
+
+            for view_name in StatisticsViews.VIEWS:
+                connection.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}'))
+                connection.execute(text(
+                    'UPDATE stat_view_refreshes SET refreshed_at = :now WHERE view_name = :view_name'
+                ), {'now': datetime.utcnow(), 'view_name': view_name})
+
+        return True
+
+    @staticmethod
+    def refreshed_at(view_name):
+        """Момент последнего обновления представления (UTC) или None"""
+        return db.session.execute(
+            text('SELECT refreshed_at FROM stat_view_refreshes WHERE view_name = :view_name'),
+            {'view_name': view_name}
+        ).scalar()
+
+    @staticmethod
+    def register_jobs(app, scheduler):
+        """Добавить задачу обновления в планировщик, если представления используются"""
+        with app.app_context():
+            if not StatisticsViews.enabled():
+                return
+
+        scheduler.add_job(
+            'refresh_stat_views',
+            app.config.get('STATS_MATVIEWS_REFRESH_INTERVAL', 300),
+            StatisticsViews.refresh
+        )
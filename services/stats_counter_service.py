@@ -0,0 +1,262 @@
+from collections import Counter
+
+import click
+from database import db
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select
+
+
+class StatsCounterService:
+    """
+    Инкрементальное обновление таблицы stats_counters
+
+    Изменения заявок через ORM (вставка, смена статуса, переназначение, удаление)
+    перехватываются в before_flush и применяются UPSERT-ом в той же транзакции.
+    Массовые UPDATE в обход ORM передают свои изменения через apply_changes().
+    Старое состояние читается из БД под SELECT ... FOR UPDATE (locked_states),
+    поэтому разница считается от той версии строки, которая будет перезаписана.
+    """
+
+    # Поля заявки, от которых зависят счетчики
+    TRACKED_FIELDS = ('request_status', 'tech_type', 'master_id', 'start_date', 'completion_date')
+
+    @staticmethod
+    def register():
+        """Подписка на before_flush (один раз на процесс)"""
+        if not event.contains(db.session, 'before_flush', StatsCounterService._before_flush):
+            event.listen(db.session, 'before_flush', StatsCounterService._before_flush)
+
+    @staticmethod
+    def contributions(state):
+        """Вклад одной заявки в счетчики: {(scope, key): значение}"""
+        from models.repair_request import ACTIVE_STATUSES, COMPLETED_STATUSES
+
+        result = Counter()
+        result[('total', '')] += 1
+        result[('status', state['request_status'])] += 1
+        result[('tech_type', state['tech_type'])] += 1
+
+        if state['master_id']:
+            if state['request_status'] in ACTIVE_STATUSES:
+                result[('master_active', str(state['master_id']))] += 1
+            elif state['request_status'] in COMPLETED_STATUSES:
+                result[('master_completed', str(state['master_id']))] += 1
+
+        if state['start_date'] and state['completion_date']:
+            result[('completion', 'days_sum')] += (state['completion_date'] - state['start_date']).days
+            result[('completion', 'count')] += 1
+
+        return result
+
+    @staticmethod
+    def diff(old_state, new_state):
+        """Разница вкладов: old_state=None - вставка, new_state=None - удаление"""
+        deltas = Counter()
+
+        if new_state:
+            deltas.update(StatsCounterService.contributions(new_state))
+        if old_state:
+            deltas.subtract(StatsCounterService.contributions(old_state))
+
+        return deltas
+
+    @staticmethod
+    def apply(connection, deltas):
+        """UPSERT value = value + delta; строки в фиксированном порядке против взаимоблокировок"""
+        from models.stats_counter import StatsCounter
+
+        rows = [
+            {'scope': scope, 'key': key, 'value': delta}
+            for (scope, key), delta in sorted(deltas.items())
+            if delta
+        ]
+        if not rows:
+            return
+
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = StatsCounter.__table__
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.key],
+            set_={'value': table.c.value + statement.excluded.value}
+        )
+        connection.execute(statement)
+
+    @staticmethod
+    def apply_changes(session, changes):
+        """Применить список (old_state, new_state) в транзакции сессии"""
+        from services.timeseries_service import TimeseriesService
+
+        deltas = Counter()
+        for old_state, new_state in changes:
+            deltas.update(StatsCounterService.diff(old_state, new_state))
+
+        StatsCounterService.apply(session.connection(), deltas)
+        # После commit изменения читают подписчики after_commit (MasterAssignment)
+        session.info.setdefault('stats_counter_deltas', Counter()).update(deltas)
+        # Задетые закрытые дни будут заново агрегированы в stats_daily
+        TimeseriesService.invalidate_days(session.connection(), changes)
+        return deltas
+
+    @staticmethod
+    def locked_states(connection, request_ids):
+        """
+        {request_id: поля счетчиков} из БД с блокировкой строк до конца транзакции
+
+        Строки блокируются по возрастанию id против взаимоблокировок; SQLite
+        FOR UPDATE не поддерживает, там транзакция записи и так одна.
+        """
+        from models.repair_request import RepairRequest
+
+        if not request_ids:
+            return {}
+
+        columns = [getattr(RepairRequest, name) for name in StatsCounterService.TRACKED_FIELDS]
+        rows = connection.execute(
+            select(RepairRequest.request_id, *columns)
+            .where(RepairRequest.request_id.in_(sorted(request_ids)))
+            .order_by(RepairRequest.request_id)
+            .with_for_update()
+        )
+        return {
+            row.request_id: {field: getattr(row, field) for field in StatsCounterService.TRACKED_FIELDS}
+            for row in rows
+        }
+
+    @staticmethod
+    def _before_flush(session, flush_context, instances):
+        from models.repair_request import RepairRequest
+
+        changes = []
+
+        for obj in session.new:
+            if isinstance(obj, RepairRequest):
+                changes.append((None, StatsCounterService._current_state(obj)))
+
+        deleted = [obj for obj in session.deleted if isinstance(obj, RepairRequest)]
+        dirty = [
+            obj for obj in session.dirty
+            if isinstance(obj, RepairRequest) and obj not in session.deleted and session.is_modified(obj)
+        ]
+
+        # Загруженные в сессию значения могли устареть: другая транзакция
+        # могла изменить строку после чтения
+        states = StatsCounterService.locked_states(
+            session.connection(),
+            {obj.request_id for obj in deleted + dirty}
+        )
+
+        for obj in deleted:
+            if obj.request_id in states:
+                changes.append((states[obj.request_id], None))
+
+        for obj in dirty:
+            old_state = states.get(obj.request_id)
+            if old_state is None:
+                continue
+            new_state = StatsCounterService._new_state(obj, old_state)
+            if old_state != new_state:
+                changes.append((old_state, new_state))
+
+        if changes:
+            StatsCounterService.apply_changes(session, changes)
+
+    @staticmethod
+    def _current_state(obj):
+        return {field: getattr(obj, field) for field in StatsCounterService.TRACKED_FIELDS}
+
+    @staticmethod
+    def _new_state(obj, old_state):
+        """Строка после flush: UPDATE пишет только измененные в сессии поля"""
+        attrs = inspect(obj).attrs
+        state = dict(old_state)
+
+        for field in StatsCounterService.TRACKED_FIELDS:
+            if attrs[field].history.added:
+                state[field] = getattr(obj, field)
+
+        return state
+
+    @staticmethod
+    def read_scope(scope):
+        """Все ненулевые счетчики разреза: {key: value}"""
+        from models.stats_counter import StatsCounter
+
+        rows = db.session.query(StatsCounter.key, StatsCounter.value).filter(
+            StatsCounter.scope == scope,
+            StatsCounter.value != 0
+        ).all()
+        return {key: int(value) for key, value in rows}
+
+    @staticmethod
+    def read_value(scope, key=''):
+        from models.stats_counter import StatsCounter
+
+        value = db.session.query(StatsCounter.value).filter(
+            StatsCounter.scope == scope,
+            StatsCounter.key == key
+        ).scalar()
+        return int(value) if value is not None else 0
+
+    @staticmethod
+    def compute_from_scratch():
+        """Полный пересчет счетчиков по repair_requests (только для проверки и восстановления)"""
+        from models.repair_request import RepairRequest
+
+        columns = [getattr(RepairRequest, name) for name in StatsCounterService.TRACKED_FIELDS]
+        expected = Counter()
+
+        for row in db.session.execute(select(*columns)).yield_per(1000):
+            expected.update(StatsCounterService.contributions(dict(row._mapping)))
+
+        return {key: value for key, value in expected.items() if value}
+
+    @staticmethod
+    def verify():
+        """Расхождения таблицы с пересчетом: [{'scope', 'key', 'stored', 'expected'}]"""
+        from models.stats_counter import StatsCounter
+
+        stored = {
+            (row.scope, row.key): int(row.value)
+            for row in StatsCounter.query.filter(StatsCounter.value != 0)
+        }
+        expected = StatsCounterService.compute_from_scratch()
+
+        return [
+            {'scope': scope, 'key': key, 'stored': stored.get((scope, key), 0), 'expected': expected.get((scope, key), 0)}
+            for scope, key in sorted(set(stored) | set(expected))
+            if stored.get((scope, key), 0) != expected.get((scope, key), 0)
+        ]
+
+    @staticmethod
+    def rebuild():
+        """Перезаписать таблицу пересчитанными значениями"""
+        from models.stats_counter import StatsCounter
+
+        expected = StatsCounterService.compute_from_scratch()
+
+        StatsCounter.query.delete()
+        StatsCounterService.apply(db.session.connection(), Counter(expected))
+        db.session.commit()
+
+        return len(expected)
+
+
+@click.command('stats-counters')
+@click.argument('action', type=click.Choice(['verify', 'rebuild']))
+@with_appcontext
+def stats_counters_command(action):
+    """Проверка или пересчет stats_counters: flask --app app stats-counters verify|rebuild"""
+    if action == 'verify':
+        mismatches = StatsCounterService.verify()
+        for item in mismatches:
+            click.echo(f"✗ {item['scope']}/{item['key']}: в таблице {item['stored']}, должно быть {item['expected']}")
+        click.echo('✓ Счетчики совпадают' if not mismatches else f'Расхождений: {len(mismatches)}')
+        raise SystemExit(1 if mismatches else 0)
+
+    count = StatsCounterService.rebuild()
+    click.echo(f'✓ Счетчики пересчитаны: {count}')
@@ -0,0 +1,296 @@
+from datetime import date, datetime, timedelta
+
+import click
+from database import db
+from flask.cli import with_appcontext
+from sqlalchemy import exists, func, literal, select, text, union_all
+
+
+class TimeseriesService:
+    """
+    Поступление и выполнение заявок по дням, неделям и месяцам
+
+    Закрытые дни (до сегодняшнего) агрегируются в stats_daily фоновой задачей
+    roll_up и отмечаются в stats_daily_days. Запрос только читает: отмеченные
+    дни - из stats_daily, остальные и сегодняшний - по repair_requests.
+    Изменение заявки, задевающее закрытый день (дата, тип техники, удаление),
+    сбрасывает агрегат этого дня до следующего запуска roll_up.
+
+    В PostgreSQL roll_up берет исключительную, а сброс - разделяемую
+    транзакционную advisory-блокировку: агрегат, посчитанный до изменения
+    заявки, не может появиться после его сброса.
+    """
+
+    BUCKETS = ('day', 'week', 'month')
+    GROUPS = ('tech_type',)
+
+    # Поля заявки, от которых зависят дневные агрегаты
+    DAY_FIELDS = ('start_date', 'completion_date', 'tech_type')
+
+    # Ключ advisory-блокировки roll_up / invalidate_days
+    ROLLUP_LOCK_KEY = 7270904
+
+    @staticmethod
+    def get_timeseries(date_from, date_to, bucket='day', group_by=None):
+        """Ряд {'period', 'created', 'completed'} по всем периодам диапазона (пустые - нулями)"""
+        today = date.today()
+        closed_to = min(date_to, today - timedelta(days=1))
+
+        rows = []
+        live_days = []
+        if date_from <= closed_to:
+            closed_rows, rolled_days = TimeseriesService._read_closed(date_from, closed_to)
+            rows += closed_rows
+            live_days += [
+                date_from + timedelta(days=offset)
+                for offset in range((closed_to - date_from).days + 1)
+                if date_from + timedelta(days=offset) not in rolled_days
+            ]
+        if date_from <= today <= date_to:
+            live_days.append(today)
+        rows += TimeseriesService._read_live(live_days)
+
+        periods = TimeseriesService._periods(date_from, date_to, bucket)
+        totals = {}
+        for day, tech_type, created, completed in rows:
+            key = (TimeseriesService.period_start(day, bucket), tech_type if group_by else None)
+            current = totals.get(key, (0, 0))
+            totals[key] = (current[0] + created, current[1] + completed)
+
+        def points(group):
+            return [
+                {
+                    'period': period.isoformat(),
+                    'created': totals.get((period, group), (0, 0))[0],
+                    'completed': totals.get((period, group), (0, 0))[1]
+                }
+                for period in periods
+            ]
+
+        result = {
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'bucket': bucket,
+            'group_by': group_by
+        }
+
+        if group_by:
+            result['groups'] = [
+                {'tech_type': group, 'points': points(group)}
+                for group in sorted({group for _, group in totals})
+            ]
+        else:
+            result['points'] = points(None)
+
+        return result
+
+    @staticmethod
+    def roll_up(date_from=None, date_to=None):
+        """
+        Агрегировать еще не отмеченные закрытые дни одним INSERT ... SELECT
+
+        По умолчанию - от первой даты заявок до вчерашнего дня. Выполняется в
+        отдельной транзакции (задача планировщика, CLI); возвращает число
+        агрегированных дней или None, если roll_up уже идет или идет сброс.
+        """
+        from models.repair_request import RepairRequest
+        from models.stats_daily import StatsDaily, StatsDailyDay
+
+        with db.engine.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                locked = connection.execute(
+                    text('SELECT pg_try_advisory_xact_lock(:key)'),
+                    {'key': TimeseriesService.ROLLUP_LOCK_KEY}
+                ).scalar()
+                if not locked:
+                    return None
+
+            date_to = date_to or date.today() - timedelta(days=1)
+            if date_from is None:
+                first_dates = connection.execute(select(
+                    func.min(RepairRequest.start_date),
+                    func.min(RepairRequest.completion_date)
+                )).one()
+                first_dates = [day for day in first_dates if day]
+                if not first_dates:
+                    return 0
+                date_from = min(first_dates)
+
+            done = set(connection.execute(
+                select(StatsDailyDay.day).where(StatsDailyDay.day.between(date_from, date_to))
+            ).scalars())
+            missing = [
+                date_from + timedelta(days=offset)
+                for offset in range((date_to - date_from).days + 1)
+                if date_from + timedelta(days=offset) not in done
+            ]
+            if not missing:
+                return 0
+
+            events = TimeseriesService._events(missing[0], missing[-1]).subquery()
+            aggregated = select(
+                events.c.day,
+                events.c.tech_type,
+                func.sum(events.c.created),
+                func.sum(events.c.completed)
+            ).where(
+                ~exists().where(StatsDailyDay.day == events.c.day)
+            ).group_by(events.c.day, events.c.tech_type)
+
+            insert = TimeseriesService._insert(connection)
+
+            connection.execute(insert(StatsDaily.__table__).from_select(
+                ['day', 'tech_type', 'created_count', 'completed_count'], aggregated
+            ).on_conflict_do_nothing())
+
+            rolled_up_at = datetime.utcnow()
+            connection.execute(insert(StatsDailyDay.__table__).values([
+                {'day': day, 'rolled_up_at': rolled_up_at} for day in missing
+            ]).on_conflict_do_nothing())
+
+        return len(missing)
+
+    @staticmethod
+    def invalidate_days(connection, changes):
+        """Сбросить агрегаты закрытых дней, задетых изменениями (old_state, new_state)"""
+        from models.stats_daily import StatsDaily, StatsDailyDay
+
+        today = date.today()
+        days = set()
+
+        for old_state, new_state in changes:
+            if old_state and new_state and all(
+                old_state[field] == new_state[field] for field in TimeseriesService.DAY_FIELDS
+            ):
+                continue
+            for state in (old_state, new_state):
+                if state:
+                    days.update(
+                        day for day in (state['start_date'], state['completion_date'])
+                        if day and day < today
+                    )
+
+        if not days:
+            return
+
+        if connection.dialect.name == 'postgresql':
+            # До конца транзакции изменения: roll_up не запишет агрегат по старым данным
+            connection.execute(
+                text('SELECT pg_advisory_xact_lock_shared(:key)'),
+                {'key': TimeseriesService.ROLLUP_LOCK_KEY}
+            )
+
+        days = sorted(days)
+        connection.execute(StatsDaily.__table__.delete().where(StatsDaily.day.in_(days)))
+        connection.execute(StatsDailyDay.__table__.delete().where(StatsDailyDay.day.in_(days)))
+
+    @staticmethod
+    def period_start(day, bucket):
+        """Первый день периода: сам день, понедельник недели или первое число месяца"""
+        if bucket == 'week':
+            return day - timedelta(days=day.weekday())
+        if bucket == 'month':
+            return day.replace(day=1)
+        return day
+
+    @staticmethod
+    def _periods(date_from, date_to, bucket):
+        periods = []
+        period = TimeseriesService.period_start(date_from, bucket)
+
+        while period <= date_to:
+            periods.append(period)
+            if bucket == 'week':
+                period += timedelta(days=7)
+            elif bucket == 'month':
+                period = (period + timedelta(days=32)).replace(day=1)
+            else:
+                period += timedelta(days=1)
+
+        return periods
+
+    @staticmethod
+    def _events(date_from, date_to):
+        """Поступления по start_date и выполнения по completion_date как строки (day, tech_type, created, completed)"""
+        from models.repair_request import RepairRequest
+
+        created = select(
+            RepairRequest.start_date.label('day'),
+            RepairRequest.tech_type.label('tech_type'),
+            literal(1).label('created'),
+            literal(0).label('completed')
+        ).where(RepairRequest.start_date.between(date_from, date_to))
+
+        completed = select(
+            RepairRequest.completion_date.label('day'),
+            RepairRequest.tech_type.label('tech_type'),
+            literal(0).label('created'),
+            literal(1).label('completed')
+        ).where(RepairRequest.completion_date.between(date_from, date_to))
+
+        return union_all(created, completed)
+
+    @staticmethod
+    def _read_closed(date_from, date_to):
+        """(строки агрегатов, агрегированные дни); отметки и агрегаты читаются одним запросом"""
+        from models.stats_daily import StatsDaily, StatsDailyDay
+
+        rows = []
+        days = set()
+
+        for day, tech_type, created, completed in db.session.execute(
+            select(
+                StatsDailyDay.day,
+                StatsDaily.tech_type,
+                StatsDaily.created_count,
+                StatsDaily.completed_count
+            ).outerjoin(StatsDaily, StatsDaily.day == StatsDailyDay.day)
+            .where(StatsDailyDay.day.between(date_from, date_to))
+        ):
+            days.add(day)
+            # День без заявок отмечен, но строк агрегата у него нет
+            if tech_type is not None:
+                rows.append((day, tech_type, created, completed))
+
+        return rows, days
+
+    @staticmethod
+    def _read_live(days):
+        """Строки (day, tech_type, created, completed) по repair_requests для указанных дней"""
+        if not days:
+            return []
+
+        days = set(days)
+        events = TimeseriesService._events(min(days), max(days)).subquery()
+
+        return [
+            (day, tech_type, int(created), int(completed))
+            for day, tech_type, created, completed in db.session.execute(
+                select(
+                    events.c.day,
+                    events.c.tech_type,
+                    func.sum(events.c.created),
+                    func.sum(events.c.completed)
+                ).group_by(events.c.day, events.c.tech_type)
+            )
+            if day in days
+        ]
+
+    @staticmethod
+    def _insert(connection):
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+
+
+@click.command('stats-daily-rollup')
+@with_appcontext
+def stats_daily_rollup_command():
+    """Агрегировать закрытые дни в stats_daily: flask --app app stats-daily-rollup"""
+    count = TimeseriesService.roll_up()
+    if count is None:
+        click.echo('Агрегирование уже выполняется')
+    else:
+        click.echo(f'✓ Агрегировано дней: {count}')
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class TokenCache:
+    """
+    LRU-кэш проверенных JWT
+
+    Ключ - sha256 токена (сам токен в памяти не хранится), запись живет до exp
+    токена. Размер ограничен TOKEN_CACHE_SIZE (0 - кэш выключен). Кэш локален
+    для процесса: evict_* действует только в текущем воркере.
+    """
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # sha256 -> (exp, payload)
+    _by_user = {}  # user_id -> {sha256}
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, token):
+        """Payload проверенного токена или None"""
+        if not current_app.config.get('TOKEN_CACHE_SIZE', 0):
+            return None
+
+        key = cls.key(token)
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+
+            if entry is None:
+                cls._misses += 1
+                return None
+
+            if entry[0] <= time.time():
+                cls._remove(key)
+                cls._misses += 1
+                return None
+
+            cls._entries.move_to_end(key)
+            cls._hits += 1
+            return dict(entry[1])
+
+    @classmethod
+    def put(cls, token, payload):
+        """Сохранить payload после успешной проверки подписи"""
+        size = current_app.config.get('TOKEN_CACHE_SIZE', 0)
+        exp = payload.get('exp')
+        if not size or exp is None:
+            return
+
+        key = cls.key(token)
+
+        with cls._lock:
+            cls._remove(key)
+            cls._entries[key] = (exp, dict(payload))
+            cls._by_user.setdefault(payload.get('user_id'), set()).add(key)
+
+            while len(cls._entries) > size:
+                cls._remove(next(iter(cls._entries)))
+                cls._evictions += 1
+
+    @classmethod
+    def evict_token(cls, token):
+        with cls._lock:
+            cls._remove(cls.key(token))
+
+    @classmethod
+    def evict_user(cls, user_id):
+        """Удалить все кэшированные токены пользователя (выход, смена роли, удаление)"""
+        with cls._lock:
+            for key in list(cls._by_user.get(user_id, ())):
+                cls._remove(key)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._by_user.clear()
+
+    @classmethod
+    def stats(cls):
+        """Счетчики попаданий и промахов"""
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            return {
+                'entries': len(cls._entries),
+                'max_entries': current_app.config.get('TOKEN_CACHE_SIZE', 0),
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'hit_rate': round(cls._hits / lookups, 4) if lookups else None,
+                'evictions': cls._evictions
+            }
+
+    @classmethod
+    def _remove(cls, key):
+        entry = cls._entries.pop(key, None)
+        if entry is None:
+            return
+
+        user_id = entry[1].get('user_id')
+        keys = cls._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del cls._by_user[user_id]
@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from database import db
+from flask import current_app
+from sqlalchemy import text
+
+
+class TokenRevocation:
+    """
+    Отзыв JWT до истечения срока
+
+    Постоянное хранилище - revoked_tokens (по jti) и user_token_cutoffs (все
+    токены пользователя, выданные до момента отзыва). В памяти процесса
+    хранятся множество jti и словарь user_id -> момент, поэтому проверка
+    в verify_token - это поиск в set и dict. Отзывы из других воркеров
+    подхватываются задачей refresh() раз в TOKEN_REVOCATION_REFRESH_INTERVAL.
+    """
+
+    _lock = threading.Lock()
+    _jtis = frozenset()
+    _cutoffs = {}  # user_id -> unix-время отзыва (с долями секунды)
+    _loaded = False
+
+    @classmethod
+    def is_revoked(cls, payload):
+        """Токен отозван по jti или по моменту отзыва токенов пользователя"""
+        if not cls._loaded:
+            cls.refresh()
+
+        if payload.get('jti') in cls._jtis:
+            return True
+
+        cutoff = cls._cutoffs.get(payload.get('user_id'))
+        # Токены без iat (выданные до появления отзыва) считаются старыми
+        return cutoff is not None and payload.get('iat', 0) < cutoff
+
+    @staticmethod
+    def token_lifetime():
+        """Срок жизни токена (AuthService.generate_token): старые записи больше не нужны"""
+        return timedelta(hours=current_app.config.get('TOKEN_LIFETIME_HOURS', 24))
+
+    @classmethod
+    def revoke_token(cls, payload):
+        """Отозвать один токен (выход)"""
+        jti = payload.get('jti')
+        if not jti:
+            return False
+
+        expires_at = datetime.utcfromtimestamp(payload['exp'])
+        db.session.execute(text(
+            'INSERT INTO revoked_tokens (jti, user_id, expires_at, revoked_at) '
+            'VALUES (:jti, :user_id, :expires_at, :revoked_at) '
+            'ON CONFLICT (jti) DO NOTHING'
+        ), {
+            'jti': jti,
+            'user_id': payload.get('user_id'),
+            'expires_at': expires_at,
+            'revoked_at': datetime.utcnow()
+        })
+        db.session.commit()
+
+        with cls._lock:
+            cls._jtis = cls._jtis | {jti}
+        return True
+
+    @classmethod
+    def revoke_user(cls, user_id):
+        """Отозвать все уже выданные токены пользователя (удаление, смена роли или пароля)"""
+        now = datetime.utcnow()
+        db.session.execute(text(
+            'INSERT INTO user_token_cutoffs (user_id, revoked_before) VALUES (:user_id, :now) '
+            'ON CONFLICT (user_id) DO UPDATE SET revoked_before = excluded.revoked_before'
+        ), {'user_id': user_id, 'now': now})
+        db.session.commit()
+
+        with cls._lock:
+            cls._cutoffs = {**cls._cutoffs, user_id: cls._timestamp(now)}
+
+    @classmethod
+    def refresh(cls):
+        """Удалить истекшие записи и перечитать отзывы из БД"""
+        now = datetime.utcnow()
+
+        db.session.execute(text('DELETE FROM revoked_tokens WHERE expires_at < :now'), {'now': now})
+        db.session.execute(
+            text('DELETE FROM user_token_cutoffs WHERE revoked_before < :oldest'),
+            {'oldest': now - cls.token_lifetime()}
+        )
+        db.session.commit()
+
+        jtis = frozenset(db.session.execute(text('SELECT jti FROM revoked_tokens')).scalars())
+        cutoffs = {
+            user_id: cls._timestamp(revoked_before)
+            for user_id, revoked_before in db.session.execute(
+                text('SELECT user_id, revoked_before FROM user_token_cutoffs')
+            )
+        }
+
+        # Замена ссылок целиком: читатели без блокировки видят старое или новое состояние
+        with cls._lock:
+            cls._jtis = jtis
+            cls._cutoffs = cutoffs
+            cls._loaded = True
+
+    @staticmethod
+    def _timestamp(value):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.replace(tzinfo=timezone.utc).timestamp()
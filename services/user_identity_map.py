@@ -0,0 +1,72 @@
+from flask import g
+
+
+class UserIdentityMap:
+    """
+    Пользователи, загруженные в рамках одного запроса
+
+    Обработчик заранее объявляет нужные user_id через prefetch(), и первый
+    get() загружает их все одним SELECT ... WHERE user_id IN (...).
+    Каждый пользователь читается из БД не больше одного раза за запрос;
+    отсутствующие id тоже запоминаются.
+    """
+
+    @staticmethod
+    def _state():
+        if 'user_identity_map' not in g:
+            g.user_identity_map = {'loaded': {}, 'pending': set()}
+        return g.user_identity_map
+
+    @staticmethod
+    def prefetch(user_ids):
+        """Отложить загрузку пользователей до первого get()"""
+        state = UserIdentityMap._state()
+        state['pending'].update(
+            user_id for user_id in user_ids
+            if user_id is not None and user_id not in state['loaded']
+        )
+
+    @staticmethod
+    def get(user_id):
+        """User или None; вместе с ним загружаются все отложенные id"""
+        if user_id is None:
+            return None
+
+        state = UserIdentityMap._state()
+        if user_id not in state['loaded']:
+            state['pending'].add(user_id)
+            UserIdentityMap._load(state)
+
+        return state['loaded'][user_id]
+
+    @staticmethod
+    def get_many(user_ids):
+        """{user_id: User или None} одним запросом"""
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        UserIdentityMap.prefetch(user_ids)
+        return {user_id: UserIdentityMap.get(user_id) for user_id in user_ids}
+
+    @staticmethod
+    def add(user):
+        """Запомнить уже загруженного пользователя"""
+        UserIdentityMap._state()['loaded'][user.user_id] = user
+
+    @staticmethod
+    def full_name(user_id, default=None):
+        user = UserIdentityMap.get(user_id)
+        return user.full_name if user else default
+
+    @staticmethod
+    def _load(state):
+        from models.user import User
+
+        pending = state['pending'] - set(state['loaded'])
+        state['pending'] = set()
+        if not pending:
+            return
+
+        users = User.query.filter(User.user_id.in_(sorted(pending))).all()
+        found = {user.user_id: user for user in users}
+
+        for user_id in pending:
+            state['loaded'][user_id] = found.get(user_id)
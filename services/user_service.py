@@ -1,16 +1,20 @@
 from database import db
-from werkzeug.security import generate_password_hash
+from sqlalchemy.orm import load_only
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
 
 
 class UserService:
 
     @staticmethod
-    def get_all_users():
-        """Получить всех пользователей"""
+    def get_all_users(fields=None):
+        """Получить всех пользователей (fields - выбираемые колонки)"""
         try:
             from models.user import User
-            users = User.query.all()
-            return [u.to_dict() for u in users]
+            query = User.query
+            if fields is not None:
+                query = query.options(load_only(*[getattr(User, field) for field in fields]))
+            users = query.all()
+            return [u.to_dict(fields) for u in users]
         except Exception as e:
             return {"error": str(e)}
 
@@ -18,8 +22,8 @@ class UserService:
     def get_user_by_id(user_id):
         """Получить пользователя по ID"""
         try:
-            from models.user import User
-            user = User.query.get(user_id)
+            from services.user_identity_map import UserIdentityMap
+            user = UserIdentityMap.get(user_id)
             if not user:
                 return None
             return user.to_dict()
@@ -79,7 +83,7 @@ class UserService:
             if user_type not in allowed_types:
                 return {"error": f"Тип пользователя должен быть одним из: {', '.join(allowed_types)}"}
 
-            hashed_password = generate_password_hash(password)
+            hashed_password = PasswordHasher.hash(password)
 
             new_user = User(
                 full_name=full_name,
@@ -94,6 +98,10 @@ class UserService:
 
             return new_user.to_dict()
 
+        except PasswordHasherBusy:
+            # Перегрузка, а не ошибка данных: маршрут отвечает 503 с Retry-After
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             return {"error": str(e)}
@@ -102,8 +110,8 @@ class UserService:
     def delete_user(user_id):
         """Удалить пользователя"""
         try:
-            from models.user import User
-            user = User.query.get(user_id)
+            from services.user_identity_map import UserIdentityMap
+            user = UserIdentityMap.get(user_id)
             if not user:
                 return {"error": "Пользователь не найден"}
 
@@ -31,7 +31,8 @@ CREATE TABLE users (
         'Оператор',
         'Заказчик',
         'Менеджер по качеству'
-    ))
+    )),
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc') -- версия строки (UTC)
 );
 
 -- Таблица заявок (repair_requests - чтобы сервер не падал)
@@ -54,6 +55,8 @@ CREATE TABLE repair_requests (
     repair_parts         VARCHAR(255),
     master_id            INT,
     client_id            INT NOT NULL,
+    updated_at           TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'), -- версия строки для ETag (UTC)
+    overdue_since        DATE,                   -- когда заявка отмечена просроченной
 
     CONSTRAINT fk_requests_master
         FOREIGN KEY (master_id) REFERENCES users(user_id),
@@ -81,11 +84,29 @@ CREATE TABLE comments (
 -- 3. СОЗДАНИЕ ИНДЕКСОВ
 -- ============================================================================
 
+-- Индексы также создаются миграциями (migrations/versions), держать в синхронизации
 CREATE INDEX idx_users_type          ON users(user_type);
 CREATE INDEX idx_requests_status     ON repair_requests(request_status);
-CREATE INDEX idx_requests_master     ON repair_requests(master_id);
-CREATE INDEX idx_requests_client     ON repair_requests(client_id);
-CREATE INDEX idx_comments_request    ON comments(request_id);
+CREATE INDEX idx_requests_start_date_id ON repair_requests(start_date DESC, request_id DESC);
+
+-- Составные индексы под выборки по ролям, статусам и нагрузке мастеров
+CREATE INDEX idx_requests_client_start ON repair_requests(client_id, start_date DESC, request_id DESC);
+CREATE INDEX idx_requests_master_start ON repair_requests(master_id, start_date DESC, request_id DESC);
+CREATE INDEX idx_requests_status_start ON repair_requests(request_status, start_date DESC, request_id DESC);
+CREATE INDEX idx_requests_master_active ON repair_requests(master_id, request_status)
+    WHERE request_status IN ('Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих');
+CREATE INDEX idx_requests_active_start ON repair_requests(start_date, request_id)
+    WHERE request_status IN ('Новая заявка', 'В процессе ремонта', 'Ожидание запчастей', 'Ожидание комплектующих');
+CREATE INDEX idx_comments_request_created ON comments(request_id, created_at DESC);
+
+-- Полнотекстовый и нечеткий поиск по заявкам
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_requests_search ON repair_requests USING gin (
+    to_tsvector('russian'::regconfig,
+        coalesce(tech_type, '') || ' ' || coalesce(tech_model, '') || ' ' ||
+        coalesce(problem_description, '') || ' ' || coalesce(repair_parts, ''))
+);
+CREATE INDEX idx_requests_tech_model_trgm ON repair_requests USING gin (tech_model gin_trgm_ops);
 
 -- ============================================================================
 -- 4. ЗАПОЛНЕНИЕ ДАННЫХ (ТОЛЬКО БЫТСЕРВИС)
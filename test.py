@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 """
-ПОЛНОЕ ТЕСТИРОВАНИЕ БЭКЕНДА - 20 ТЕСТОВ
+ПОЛНОЕ ТЕСТИРОВАНИЕ БЭКЕНДА - 21 ТЕСТ
 Соответствует требованиям учебной практики
 Покрывает: CRUD, валидацию, права доступа, статистику, edge cases
 """
@@ -839,12 +839,71 @@ def test_20_get_nonexistent_request(token: str) -> bool:
         return False
 
 
+def test_21_assign_master_string_id(token: str, request_id: Optional[int]) -> bool:
+    """ТЕСТ 21: Назначение мастера с id строкой (как отправляет фронтенд)"""
+    separator("Назначение мастера строкой id", "ТЕСТ 21")
+
+    if not request_id:
+        log("✗ Нет созданной заявки (ТЕСТ 9)", "ERR")
+        return False
+
+    try:
+        r = requests.get(
+            f"{BASE_URL}/users/specialists",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=10
+        )
+        masters = r.json().get("data", []) if r.status_code == 200 else []
+        if not masters:
+            log("✗ Нет мастеров для назначения", "ERR")
+            show_error_response(r)
+            return False
+
+        master_id = str(masters[0].get("user_id"))
+        log(f"PUT /api/requests/{request_id}", "TEST")
+        detail(f'master_id: "{master_id}" (строка из <select>)')
+
+        time.sleep(0.3)
+        r = requests.put(
+            f"{BASE_URL}/requests/{request_id}",
+            json={"master_id": master_id},
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=15
+        )
+
+        if r.status_code != 200:
+            log(f"✗ Ожидался 200, получен {r.status_code}", "ERR")
+            show_error_response(r)
+            return False
+
+        log("✓ Мастер назначен (200)", "OK")
+
+        r = requests.put(
+            f"{BASE_URL}/requests/{request_id}",
+            json={"master_id": "abc"},
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=15
+        )
+
+        if r.status_code == 400:
+            log("✓ Нечисловой master_id отклонен (400)", "OK")
+            return True
+
+        log(f"✗ Ожидался 400 для master_id='abc', получен {r.status_code}", "ERR")
+        show_error_response(r)
+        return False
+
+    except Exception as e:
+        log(f"✗ Исключение: {str(e)}", "ERR")
+        return False
+
+
 # ============================================================================
 # ГЛАВНАЯ ФУНКЦИЯ
 # ============================================================================
 
 def main():
-    separator("ПОЛНОЕ ТЕСТИРОВАНИЕ СИСТЕМЫ - 20 ТЕСТОВ")
+    separator("ПОЛНОЕ ТЕСТИРОВАНИЕ СИСТЕМЫ - 21 ТЕСТ")
     print(f"{Colors.CYAN}Начало тестирования: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
 
     tests_passed = []
@@ -969,6 +1028,11 @@ def main():
     else:
         tests_failed.append("20. Nonexistent Request")
 
+    if test_21_assign_master_string_id(test_data["manager_token"], test_data.get("created_request_id")):
+        tests_passed.append("21. Assign Master String Id")
+    else:
+        tests_failed.append("21. Assign Master String Id")
+
     # ========== ИТОГОВЫЙ ОТЧЁТ ==========
     separator("ИТОГОВЫЙ ОТЧЁТ")
     print(f"{Colors.BOLD}Дата и время завершения: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}\n")
@@ -977,7 +1041,7 @@ def main():
     groups = {
         "Аутентификация": ["01", "02", "03"],
         "Управление пользователями": ["04", "05", "06", "07"],
-        "Управление заявками": ["08", "09", "10", "11"],
+        "Управление заявками": ["08", "09", "10", "11", "21"],
         "Комментарии": ["12", "13"],
         "Статистика и отчеты": ["14", "15"],
         "Фильтрация": ["16", "17"],